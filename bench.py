@@ -0,0 +1,518 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import flet as ft
+
+import main
+import mock_server
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+METRICS = ("wall_ms", "requests", "rx_kb", "controls", "updates", "update_requests", "peak_kb")
+
+class StubPage:
+    # Substitui ft.Page sem cliente Flet conectado: guarda os controles e executa as tarefas num loop próprio
+    def __init__(self, loop):
+        self.loop = loop
+        self.controls = []
+        self.overlay = []
+        self.width, self.height = 1280, 720
+        self.window = SimpleNamespace(width=1280, height=720)
+        self.snack_bar = None
+        self.dialog = None
+        self.updates = 0
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+        self.updates += 1
+
+    def update(self, *controls):
+        self.updates += 1
+
+    def open(self, control):
+        control.open = True
+        self.updates += 1
+
+    def close(self, control):
+        control.open = False
+        self.updates += 1
+
+    def run_task(self, handler, *args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(handler(*args, **kwargs), self.loop)
+
+    def run_thread(self, handler, *args, **kwargs):
+        self.loop.call_soon_threadsafe(self.loop.run_in_executor, None, lambda: handler(*args, **kwargs))
+
+class Harness:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="bench-loop", daemon=True).start()
+        self.page = None
+        self.app = None
+        self.backend = None
+
+    def new_app(self):
+        self.page = StubPage(self.loop)
+        self.app = self.call(main.DonationApp, self.page)
+        return self.app
+
+    def call(self, fn, *args):
+        # Executa fn dentro do loop, como faria um handler do Flet
+        async def runner():
+            return fn(*args)
+        return asyncio.run_coroutine_threadsafe(runner(), self.loop).result()
+
+    def fire(self, handler, data=None, control=None):
+        event = SimpleNamespace(data=data, control=control, page=self.page)
+        if asyncio.iscoroutinefunction(handler):
+            return asyncio.run_coroutine_threadsafe(handler(event), self.loop).result()
+        return self.call(handler, event)
+
+    def wait_idle(self, timeout=300):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            pending = list(self.app.pending)
+            if not pending:
+                time.sleep(0.005)
+                if not self.app.pending:
+                    return
+                continue
+            for fut in pending:
+                try:
+                    fut.result(timeout=max(0.0, deadline - time.monotonic()))
+                except Exception as exc:
+                    print("  tarefa falhou:", repr(exc))
+        raise TimeoutError("app não ficou ociosa a tempo")
+
+def walk(control):
+    yield control
+    for child in control._get_children():
+        yield from walk(child)
+
+def count_controls(page):
+    return sum(1 for root in page.controls for _ in walk(root))
+
+def find(page, kind, **attrs):
+    for root in page.controls:
+        for c in walk(root):
+            if isinstance(c, kind) and all(getattr(c, k, None) == v for k, v in attrs.items()):
+                return c
+    return None
+
+def build_backend(size, products_per, latency_ms, jitter_ms, donors=1):
+    users, causes = mock_server.load_seed()
+    extra_users, extra_causes = mock_server.generate(size, size * products_per, donors=donors)
+    bench_receiver = {"id": "bench-receiver", "role": "receptor", "name": "Bench", "email": "bench-receiver@load", "password": "bench"}
+    own = [
+        {"id": f"bench-p{i}", "receptor_id": "bench-receiver", "title": f"Cota {i}", "description": "Item de benchmark", "value": 10.0 + i}
+        for i in range(size)
+    ]
+    backend = mock_server.Backend(users + extra_users + [bench_receiver], causes + extra_causes + own)
+    faults = mock_server.FaultConfig(latency_ms, jitter_ms, 0.0, seed=1) if latency_ms or jitter_ms else None
+    return mock_server.serve_in_thread(backend, faults=faults)
+
+def login_as(app, email, password, role):
+    res = main.api_login(email, password)
+    if not res or "access_token" not in res:
+        raise RuntimeError(f"login falhou para {email}: {res}")
+    app.session.token = res["access_token"]
+    return {"email": email, "name": email, "role": role}
+
+def received_bytes():
+    return sum(ep["bytes_received"] for ep in main.METRICS.snapshot()["endpoints"].values())
+
+def reset_client_state():
+    main.RESPONSE_CACHE.clear()
+    main.DELTA = main.DeltaSync()
+    main.reset_pool_stats()
+
+def scenario_feed(h, expand):
+    h.app.current_user = login_as(h.app, "donor0@load", "donor", "doador")
+
+    def run():
+        h.call(h.app.show_donor_feed)
+        h.wait_idle()
+        tiles = [c for root in h.page.controls for c in walk(root) if isinstance(c, ft.ExpansionTile)]
+        for tile in tiles[:expand]:
+            h.fire(tile.on_change, data="true", control=tile)
+        h.wait_idle()
+    return run
+
+def scenario_feed_revisit(h, expand):
+    # Segunda visita ao feed depois de algumas alterações no servidor: com /donator/sync só o delta trafega
+    h.app.current_user = login_as(h.app, "donor0@load", "donor", "doador")
+    h.call(h.app.show_donor_feed)
+    h.wait_idle()
+    backend = h.backend
+    with backend.lock:
+        owners = [u["id"] for u in backend.users.values() if u.get("role") == "receptor"][:5]
+        for i, owner in enumerate(owners):
+            backend._add_product(owner, f"Nova cota {i}", "Alterada após a primeira visita", 25.0 + i)
+
+    def run():
+        main.RESPONSE_CACHE.clear()
+        h.call(h.app.show_donor_feed)
+        h.wait_idle()
+        tiles = [c for root in h.page.controls for c in walk(root) if isinstance(c, ft.ExpansionTile)]
+        for tile in tiles[:expand]:
+            h.fire(tile.on_change, data="true", control=tile)
+        h.wait_idle()
+    return run
+
+def scenario_dashboard(h):
+    h.app.current_user = login_as(h.app, "bench-receiver@load", "bench", "receptor")
+
+    def run():
+        h.call(h.app.show_receptor_dashboard)
+        h.wait_idle()
+    return run
+
+def scenario_dashboard_create(h):
+    h.app.current_user = login_as(h.app, "bench-receiver@load", "bench", "receptor")
+    h.call(h.app.show_receptor_dashboard)
+    h.wait_idle()
+
+    def run():
+        find(h.page, ft.TextField, label="Título do Produto/Cota").value = "Nova cota"
+        find(h.page, ft.TextField, label="Valor (ex: 50.00)").value = "12,50"
+        h.fire(find(h.page, ft.ElevatedButton, text="Criar").on_click)
+        h.wait_idle()
+    return run
+
+def scenario_dashboard_import(h, rows):
+    h.app.current_user = login_as(h.app, "bench-receiver@load", "bench", "receptor")
+    h.call(h.app.show_receptor_dashboard)
+    h.wait_idle()
+    csv_rows = "\n".join(f"Cota importada {i};Item de benchmark;{10 + i},50" for i in range(rows))
+
+    def run():
+        find(h.page, ft.TextField, multiline=True, min_lines=4).value = "title;description;value\n" + csv_rows
+        h.fire(find(h.page, ft.ElevatedButton, text="Importar").on_click)
+        h.wait_idle()
+    return run
+
+def scenario_login(h):
+    def run():
+        find(h.page, ft.TextField, label="E-mail").value = "donor0@load"
+        find(h.page, ft.TextField, label="Senha").value = "donor"
+        h.fire(find(h.page, ft.ElevatedButton, text="Entrar").on_click)
+        h.wait_idle()
+    return run
+
+SCENARIOS = {
+    "feed": lambda h, args: scenario_feed(h, args.expand),
+    "feed_revisit": lambda h, args: scenario_feed_revisit(h, args.expand),
+    "dashboard": lambda h, args: scenario_dashboard(h),
+    "dashboard_create": lambda h, args: scenario_dashboard_create(h),
+    "dashboard_import": lambda h, args: scenario_dashboard_import(h, args.import_rows),
+    "login": lambda h, args: scenario_login(h),
+}
+
+def measure(h, name, args, trace_memory):
+    reset_client_state()
+    h.new_app()
+    run = SCENARIOS[name](h, args)
+    gc.collect()
+    before_requests = main.pool_stats()["requests"]
+    before_bytes = received_bytes()
+    before_updates = h.page.updates
+    before_requested = h.app.updates.stats()["requested"]
+    owned = trace_memory and not tracemalloc.is_tracing()
+    if owned:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    run()
+    wall_ms = (time.perf_counter() - started) * 1000
+    peak = 0
+    if trace_memory and tracemalloc.is_tracing():
+        peak = tracemalloc.get_traced_memory()[1]
+    if owned:
+        tracemalloc.stop()
+    return {
+        "wall_ms": round(wall_ms, 1),
+        "requests": main.pool_stats()["requests"] - before_requests,
+        "rx_kb": round((received_bytes() - before_bytes) / 1024, 1),
+        "controls": count_controls(h.page),
+        "updates": h.page.updates - before_updates,
+        "update_requests": h.app.updates.stats()["requested"] - before_requested,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def run_bench(args):
+    main.DISK_STORE = main.DiskStore(None)
+    main.DONATION_JOURNAL = main.DonationJournal(None)
+    main.DELTA_SYNC = args.delta
+    h = Harness()
+    results = []
+    for size in args.sizes:
+        server, url = build_backend(size, args.products_per, args.latency_ms, args.jitter_ms)
+        main.close_http_clients()
+        main.API_URL = url
+        h.backend = server.RequestHandlerClass.backend
+        try:
+            for name in args.scenarios:
+                # Tempo medido sem tracemalloc; a memória de pico vem de uma segunda execução instrumentada
+                timed = measure(h, name, args, trace_memory=False)
+                traced = measure(h, name, args, trace_memory=True)
+                timed["peak_kb"] = traced["peak_kb"]
+                row = {"scenario": name, "size": size, **timed}
+                results.append(row)
+                print(f"{name:<18} {size:>7} " + " ".join(f"{row[m]:>10}" for m in METRICS))
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def new_sessions(h, count):
+    return [h.call(main.DonationApp, StubPage(h.loop)) for _ in range(count)]
+
+def login_sessions(h, apps, timeout):
+    # Faz login pela tela em todos os apps ao mesmo tempo e espera cada um ficar ocioso.
+    # Retorna (latências em s por índice, índices que não terminaram, tempo total em s)
+    running = {}
+    started = time.perf_counter()
+    for i, app in enumerate(apps):
+        find(app.page, ft.TextField, label="E-mail").value = f"donor{i}@load"
+        find(app.page, ft.TextField, label="Senha").value = "donor"
+        button = find(app.page, ft.ElevatedButton, text="Entrar")
+        event = SimpleNamespace(data=None, control=button, page=app.page)
+        running[i] = asyncio.run_coroutine_threadsafe(button.on_click(event), h.loop)
+    latencies = {}
+    deadline = started + timeout
+    while running and time.perf_counter() < deadline:
+        now = time.perf_counter()
+        for i, fut in list(running.items()):
+            if fut.done() and not apps[i].pending:
+                latencies[i] = now - started
+                del running[i]
+        time.sleep(0.002)
+    return latencies, running, time.perf_counter() - started
+
+def run_sessions(args):
+    # Várias abas no mesmo processo, como no modo web do Flet: cada DonationApp faz login pela tela e abre o feed
+    # ao mesmo tempo. Mede quanto cada sessão leva até ficar ociosa, a memória e se algum token vazou entre sessões
+    main.DISK_STORE = main.DiskStore(None)
+    main.DONATION_JOURNAL = main.DonationJournal(None)
+    main.DELTA_SYNC = args.delta
+    h = Harness()
+    size = args.sizes[0]
+    server, url = build_backend(size, args.products_per, args.latency_ms, args.jitter_ms, donors=args.sessions)
+    main.close_http_clients()
+    main.API_URL = url
+    backend = server.RequestHandlerClass.backend
+    try:
+        # Primeira passada só para os tempos: o tracemalloc deixa cada alocação bem mais lenta
+        reset_client_state()
+        gc.collect()
+        apps = new_sessions(h, args.sessions)
+        latencies, running, wall = login_sessions(h, apps, args.session_timeout)
+
+        failed = leaked = 0
+        for i, app in enumerate(apps):
+            if app.session.token is None:
+                failed += 1  # login recusado, com erro ou ainda em andamento
+                continue
+            # Vazamento é só um token emitido para outro usuário (ou uma tela mostrando outro usuário)
+            owner = (backend.user_for(app.session.token) or {}).get("email")
+            shown = (app.current_user or {}).get("email")
+            if owner != f"donor{i}@load" or shown not in (None, owner):
+                leaked += 1
+        pool = main.pool_stats()
+        cache_entries = main.RESPONSE_CACHE.stats()["size"]
+        del apps
+
+        # Segunda passada, com os mesmos usuários, só para a memória
+        reset_client_state()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        apps = new_sessions(h, args.sessions)
+        built = tracemalloc.get_traced_memory()[0]
+        login_sessions(h, apps, args.session_timeout)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        ms = [v * 1000 for v in latencies.values()]
+        report = {
+            "sessions": args.sessions,
+            "size": size,
+            "completed": len(latencies),
+            "timed_out": len(running),
+            "failed_logins": failed,
+            "leaked_tokens": leaked,
+            "wall_ms": round(wall * 1000, 1),
+            "p50_ms": round(percentile(ms, 0.50), 1),
+            "p95_ms": round(percentile(ms, 0.95), 1),
+            "p99_ms": round(percentile(ms, 0.99), 1),
+            "max_ms": round(max(ms, default=0.0), 1),
+            "requests": pool["requests"],
+            "new_connections": pool["new_connections"],
+            "reuse_ratio": pool["reuse_ratio"],
+            "cache_entries": cache_entries,
+            "kb_per_session": round((current - before) / 1024 / max(1, args.sessions), 1),
+            "kb_per_idle_session": round((built - before) / 1024 / max(1, args.sessions), 1),
+            "peak_mb": round(peak / 1024 / 1024, 1),
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"{report['sessions']} sessões ({size} receptores): {report['completed']} concluídas, "
+          f"{report['timed_out']} sem terminar, {report['failed_logins']} sem login, "
+          f"{report['leaked_tokens']} com token de outro usuário")
+    print(f"  login + feed: p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms, "
+          f"máx. {report['max_ms']} ms (total {report['wall_ms']} ms)")
+    print(f"  HTTP: {report['requests']} req., {report['new_connections']} conexões novas, "
+          f"reaproveitamento {report['reuse_ratio']}, {report['cache_entries']} entradas no cache compartilhado")
+    print(f"  memória: {report['kb_per_session']} KB por sessão ({report['kb_per_idle_session']} KB antes do login), "
+          f"pico {report['peak_mb']} MB")
+    return report
+
+STARTUP_PROBE = "import main, bench; bench.startup_probe()"  # main antes de bench: o import do flet entra na medida
+
+def startup_probe():
+    # Executado num interpretador novo por run_startup: monta o app sem cliente Flet e devolve as marcas de main
+    # convertidas para ms desde o lançamento do processo (STARTUP_LAUNCHED, relógio de parede do processo pai)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="probe-loop", daemon=True).start()
+    main.main(StubPage(loop))
+    deadline = time.perf_counter() + 5
+    while "prewarmed" not in main.STARTUP and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    main_started = time.time() - (time.perf_counter() - main._STARTED)
+    offset = (main_started - float(os.environ["STARTUP_LAUNCHED"])) * 1000
+    marks = {"interpreter": round(offset, 1)}
+    marks.update((phase, round(ms + offset, 1)) for phase, ms in main.STARTUP.items())
+    print(json.dumps(marks))
+
+def run_startup(args):
+    # Cada rodada é um processo novo: o import de main precisa ser medido a frio, sem módulos já carregados
+    env = dict(os.environ, DISK_CACHE="0", DONATION_JOURNAL="0", STARTUP_REPORT="0")
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(args.startup):
+        started = time.perf_counter()
+        env["STARTUP_LAUNCHED"] = repr(time.time())
+        out = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=here, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        marks = json.loads(out.strip().splitlines()[-1])
+        marks["exited"] = round((time.perf_counter() - started) * 1000, 1)
+        runs.append(marks)
+    phases = list(dict.fromkeys(phase for marks in runs for phase in marks))
+    report = {"runs": len(runs), "phases": {}}
+    print(f"Inicialização ({len(runs)} processos, ms desde o lançamento do processo):")
+    for phase in phases:
+        ms = [marks[phase] for marks in runs if phase in marks]
+        report["phases"][phase] = {"p50_ms": round(percentile(ms, 0.50), 1), "max_ms": round(max(ms), 1)}
+        print(f"  {phase:<14} p50 {report['phases'][phase]['p50_ms']:>8} ms   máx. {report['phases'][phase]['max_ms']:>8} ms")
+    return report
+
+def compare(results, baseline, threshold):
+    # Retorna (regressões, medidas sem linha de base); cenários ou métricas novos não podem passar em silêncio
+    index = {(r["scenario"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = missing = 0
+    print("\nComparação com a linha de base:")
+    for row in results:
+        base = index.get((row["scenario"], row["size"]))
+        if base is None:
+            missing += 1
+            print(f"  {row['scenario']:<18} {row['size']:>7}  sem linha de base ?")
+            continue
+        deltas = []
+        for m in METRICS:
+            if base.get(m) is None:
+                missing += 1
+                deltas.append(f"{m}={row[m]} (sem base) ?")
+                continue
+            old, new = base[m], row[m]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > threshold:
+                flag = " !"
+                regressions += 1
+            deltas.append(f"{m}={new} ({change:+.0%}){flag}")
+        print(f"  {row['scenario']:<18} {row['size']:>7}  " + "  ".join(deltas))
+    if missing:
+        print(f"{missing} medida(s) sem linha de base: grave uma nova com --save-baseline")
+    return regressions, missing
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Mede feed, dashboard e login do DonationApp contra o backend local")
+    parser.add_argument("--sizes", default="100,1000", help="quantidades de receptores (e de produtos no dashboard), separadas por vírgula")
+    parser.add_argument("--products-per", type=int, default=5, help="produtos por receptor sintético")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="cenários a executar")
+    parser.add_argument("--expand", type=int, default=5, help="cards do feed abertos por execução")
+    parser.add_argument("--import-rows", type=int, default=100, help="linhas enviadas no cenário dashboard_import")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--delta", action="store_true", help="liga /donator/sync (DELTA_SYNC=1) em vez de baixar o feed a cada visita")
+    parser.add_argument("--sessions", type=int, default=0, help="em vez dos cenários, abre N sessões simultâneas no mesmo processo")
+    parser.add_argument("--session-timeout", type=float, default=120, help="tempo máximo (s) para as sessões ficarem ociosas")
+    parser.add_argument("--startup", type=int, default=0, help="em vez dos cenários, mede a inicialização em N processos novos")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="arquivo da linha de base")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--compare", action="store_true", help="compara com a linha de base gravada")
+    parser.add_argument("--threshold", type=float, default=0.2, help="piora relativa considerada regressão")
+    parser.add_argument("--output", help="grava os resultados em JSON")
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"cenário desconhecido: {name}")
+
+    if args.startup:
+        report = run_startup(args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        return 0
+
+    if args.sessions:
+        report = run_sessions(args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if report["leaked_tokens"]:
+            return 2  # uma sessão ficou com o token de outro usuário
+        return 1 if report["timed_out"] or report["failed_logins"] else 0
+
+    print(f"{'cenário':<18} {'tamanho':>7} " + " ".join(f"{m:>10}" for m in METRICS))
+    results = run_bench(args)
+    report = {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "args": {k: v for k, v in vars(args).items() if k in ("products_per", "expand", "import_rows", "latency_ms", "jitter_ms", "delta")}, "results": results}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    status = 0
+    if args.compare:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError):
+            print(f"Linha de base não encontrada em {args.baseline}")
+        else:
+            regressions, missing = compare(results, baseline, args.threshold)
+            status = 1 if regressions or missing else 0
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Linha de base gravada em {args.baseline}")
+    return status
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
@@ -0,0 +1,312 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+# Cada processo simula muitos clientes independentes: nada de cache em disco nem diário de doações compartilhado
+os.environ.setdefault("DISK_CACHE", "0")
+os.environ.setdefault("DONATION_JOURNAL", "0")
+
+import main
+import mock_server
+from bench import percentile
+
+SCENARIOS = ("donor", "browser", "receiver")
+DEFAULT_MIX = "donor=0.7,browser=0.25,receiver=0.05"
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"cenário desconhecido: {name}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("mistura de cenários vazia")
+    return mix
+
+def parse_spike(text):
+    # "TAXA:INÍCIO:DURAÇÃO", ex.: 500:10:5 = 500 sessões/s entre t=10s e t=15s
+    rate, start, duration = (float(v) for v in text.split(":"))
+    return rate, start, duration
+
+def rate_at(t, rate, spikes):
+    for spike_rate, start, duration in spikes:
+        if start <= t < start + duration:
+            return spike_rate
+    return rate
+
+def plan_arrivals(args):
+    # Chegadas de Poisson (taxa por trecho) com o cenário e o usuário de cada sessão já sorteados
+    rnd = random.Random(args.seed)
+    names, weights = zip(*args.mix.items())
+    arrivals = []
+    t = 0.0
+    while len(arrivals) < args.max_sessions:
+        rate = rate_at(t, args.rate, args.spikes)
+        t += rnd.expovariate(rate) if rate > 0 else 0.1
+        if t >= args.duration:
+            break
+        if rate <= 0:
+            continue
+        scenario = rnd.choices(names, weights)[0]
+        user = rnd.randrange(args.receivers if scenario == "receiver" else args.donors)
+        arrivals.append((t, scenario, user, rnd.getrandbits(32)))
+    return arrivals
+
+class Recorder:
+    # Latência e resultado de cada chamada api_* de uma sessão
+    def __init__(self):
+        self.ops = []
+
+    def call(self, op, fn, *args):
+        started = time.perf_counter()
+        res = fn(*args)
+        self.ops.append((op, time.perf_counter() - started, outcome(res)))
+        return res
+
+def outcome(res):
+    if res is None:
+        return "failed"
+    if isinstance(res, dict) and res.get("error"):
+        return f"http_{res['error']}"
+    return "ok"
+
+def browse(rec, rnd, opts):
+    receivers = main.receivers_from(rec.call("list_receivers", main.api_list_receivers, rnd.choice(list(main.FEED_ORDERS))))
+    ids = [r.id for r in receivers if r.id]
+    for rid in rnd.sample(ids, min(opts["browse"], len(ids))):
+        think(opts)
+        rec.call("get_cause_products", main.api_get_cause_products, rid)
+    return ids
+
+def think(opts):
+    if opts["think_ms"]:
+        time.sleep(opts["think_ms"] / 1000)
+
+def donor_session(rec, rnd, user, opts, donate=True):
+    res = rec.call("login", main.api_login, f"donor{user}@load", opts["donor_password"])
+    if not isinstance(res, dict) or "access_token" not in res:
+        return False
+    main.current_session().token = res["access_token"]
+    ids = browse(rec, rnd, opts)
+    if not ids:
+        return False
+    if not donate:
+        return True
+    think(opts)
+    payload = {
+        "DonorId": 0,
+        "ReceiverId": rnd.choice(ids),
+        "Amount": round(rnd.uniform(5, 200), 2),
+        "Date": str(datetime.now()),
+        "Message": "Doação de carga",
+    }
+    res = rec.call("add_donation", main.api_add_donation, payload, uuid.uuid4().hex)
+    return outcome(res) == "ok"
+
+def receiver_session(rec, rnd, user, opts):
+    res = rec.call("login", main.api_login, f"receiver{user}@load", opts["receiver_password"])
+    if not isinstance(res, dict) or "access_token" not in res:
+        return False
+    main.current_session().token = res["access_token"]
+    think(opts)
+    res = rec.call("get_products", main.api_get_products)
+    if rnd.random() < opts["create_prob"]:
+        think(opts)
+        res = rec.call("create_product", main.api_create_product, {
+            "title": f"Cota de carga {rnd.randrange(10 ** 6)}", "description": "Criada pelo gerador de carga",
+            "value": round(rnd.uniform(10, 500), 2),
+        })
+    return outcome(res) == "ok"
+
+def run_session(scenario, user, seed, opts):
+    rnd = random.Random(seed)
+    rec = Recorder()
+    if scenario == "receiver":
+        ok = receiver_session(rec, rnd, user, opts)
+    else:
+        ok = donor_session(rec, rnd, user, opts, donate=scenario == "donor")
+    return rec.ops, ok
+
+def init_worker(url, opts):
+    main.API_URL = url
+    # Clientes simulados não compartilham cache nem circuit breaker; o pool cresce até a concorrência do processo
+    if not opts["client_cache"]:
+        main.RESPONSE_CACHE = main.ResponseCache(ttls={})
+    if not opts["breaker"]:
+        main._breakers[url] = main.CircuitBreaker(threshold=float("inf"))
+    main.HTTP_MAX_CONNECTIONS = max(main.HTTP_MAX_CONNECTIONS, opts["concurrency"])
+    main.HTTP_MAX_KEEPALIVE_PER_HOST = max(main.HTTP_MAX_KEEPALIVE_PER_HOST, opts["concurrency"])
+
+def run_worker(arrivals, start_at, opts):
+    # Laço aberto: cada sessão começa no seu horário, esteja o processo folgado ou não; o atraso vira "lag"
+    lock = threading.Lock()
+    result = {"ops": {}, "outcomes": {}, "sessions": {}, "failed_sessions": Counter(), "lag": []}
+
+    def session(offset, scenario, user, seed):
+        lag = time.time() - (start_at + offset)
+        started = time.perf_counter()
+        try:
+            ops, ok = main.ApiSession().run(run_session, scenario, user, seed, opts)
+        except Exception as exc:
+            ops, ok = [("session", time.perf_counter() - started, exc.__class__.__name__)], False
+        elapsed = time.perf_counter() - started
+        with lock:
+            result["lag"].append(lag)
+            result["sessions"].setdefault(scenario, []).append(elapsed)
+            if not ok:
+                result["failed_sessions"][scenario] += 1
+            for op, seconds, status in ops:
+                result["ops"].setdefault(op, []).append(seconds)
+                result["outcomes"].setdefault(op, Counter())[status] += 1
+
+    with ThreadPoolExecutor(max_workers=opts["concurrency"], thread_name_prefix="loadgen") as pool:
+        for offset, scenario, user, seed in arrivals:
+            delay = start_at + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(session, offset, scenario, user, seed)
+    snap = main.METRICS.snapshot()["endpoints"]
+    result["endpoints"] = {label: {"status": ep["status"], "timeouts": ep["timeouts"], "errors": ep["errors"]} for label, ep in snap.items()}
+    result["finished_at"] = time.time()
+    return result
+
+def latency_summary(values):
+    ms = [v * 1000 for v in values]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 0.50), 1),
+        "p95_ms": round(percentile(ms, 0.95), 1),
+        "p99_ms": round(percentile(ms, 0.99), 1),
+        "max_ms": round(max(ms, default=0.0), 1),
+    }
+
+def merge(results, start_at):
+    ops, outcomes, sessions, endpoints = {}, {}, {}, {}
+    failed, lag = Counter(), []
+    for r in results:
+        for op, values in r["ops"].items():
+            ops.setdefault(op, []).extend(values)
+        for op, counts in r["outcomes"].items():
+            outcomes.setdefault(op, Counter()).update(counts)
+        for scenario, values in r["sessions"].items():
+            sessions.setdefault(scenario, []).extend(values)
+        failed.update(r["failed_sessions"])
+        lag.extend(r["lag"])
+        for label, ep in r["endpoints"].items():
+            total = endpoints.setdefault(label, {"status": Counter(), "timeouts": 0, "errors": 0})
+            total["status"].update(ep["status"])
+            total["timeouts"] += ep["timeouts"]
+            total["errors"] += ep["errors"]
+    elapsed = max((r["finished_at"] for r in results), default=start_at) - start_at
+    calls = sum(len(v) for v in ops.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "sessions": sum(len(v) for v in sessions.values()),
+        "failed_sessions": dict(failed),
+        "calls": calls,
+        "calls_per_s": round(calls / elapsed, 1) if elapsed > 0 else 0.0,
+        "donations_per_s": round(outcomes.get("add_donation", {}).get("ok", 0) / elapsed, 1) if elapsed > 0 else 0.0,
+        "lag": latency_summary(lag),
+        "operations": {op: dict(latency_summary(values), outcomes=dict(outcomes.get(op, {}))) for op, values in sorted(ops.items())},
+        "scenarios": {name: latency_summary(values) for name, values in sorted(sessions.items())},
+        "endpoints": {label: {"status": dict(ep["status"]), "timeouts": ep["timeouts"], "errors": ep["errors"]} for label, ep in sorted(endpoints.items())},
+    }
+
+def print_report(report):
+    print(f"\n{report['sessions']} sessões em {report['elapsed_s']}s: {report['calls']} chamadas "
+          f"({report['calls_per_s']}/s), {report['donations_per_s']} doações/s")
+    if report["failed_sessions"]:
+        print("Sessões com falha:", ", ".join(f"{k}={v}" for k, v in sorted(report["failed_sessions"].items())))
+    lag = report["lag"]
+    print(f"Atraso no início das sessões: p50 {lag['p50_ms']} ms, p95 {lag['p95_ms']} ms, máx. {lag['max_ms']} ms")
+    print(f"\n{'operação':<20} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx. ms':>9}  resultados")
+    for op, s in report["operations"].items():
+        outcomes = " ".join(f"{k}:{v}" for k, v in sorted(s["outcomes"].items()))
+        print(f"{op:<20} {s['count']:>7} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}  {outcomes}")
+    print(f"\n{'sessão':<20} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx. ms':>9}")
+    for name, s in report["scenarios"].items():
+        print(f"{name:<20} {s['count']:>7} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}")
+    print("\nRespostas HTTP por endpoint:")
+    for label, ep in report["endpoints"].items():
+        status = " ".join(f"{k}:{v}" for k, v in sorted(ep["status"].items()))
+        print(f"  {label:<45} {status}  timeouts:{ep['timeouts']}  erros:{ep['errors']}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Gerador de carga headless: sessões de doadores e receptores sobre as funções api_*")
+    parser.add_argument("--url", help="backend já em execução; sem isso sobe o backend local numa thread")
+    parser.add_argument("--rate", type=float, default=20, help="sessões novas por segundo")
+    parser.add_argument("--spike", action="append", default=[], help="pico TAXA:INÍCIO:DURAÇÃO (s); pode repetir")
+    parser.add_argument("--duration", type=float, default=30, help="duração da geração de chegadas (s)")
+    parser.add_argument("--max-sessions", type=int, default=100000, help="limite de sessões")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="pesos dos cenários donor/browser/receiver")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="processos geradores")
+    parser.add_argument("--concurrency", type=int, default=64, help="sessões simultâneas por processo")
+    parser.add_argument("--browse", type=int, default=3, help="receptores abertos por sessão de doador")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pausa entre as ações de uma sessão")
+    parser.add_argument("--create-prob", type=float, default=0.3, help="chance de um receptor criar uma cota")
+    parser.add_argument("--donor-password", default="donor")
+    parser.add_argument("--receiver-password", default="receiver")
+    parser.add_argument("--client-cache", action="store_true", help="mantém o cache de GET do cliente (compartilhado por processo)")
+    parser.add_argument("--breaker", action="store_true", help="mantém o circuit breaker do cliente (compartilhado por processo)")
+    parser.add_argument("--startup", type=float, default=3.0, help="folga (s) para os processos subirem antes da primeira chegada")
+    parser.add_argument("--output", help="grava o relatório em JSON")
+    mock_server.add_backend_args(parser)
+    parser.set_defaults(receivers=200, products=1000, donors=1000)
+    args = parser.parse_args()
+    try:
+        args.mix = parse_mix(args.mix)
+        args.spikes = [parse_spike(s) for s in args.spike]
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.donors <= 0 or ("receiver" in args.mix and args.receivers <= 0):
+        parser.error("são necessários doadores (e receptores, se o cenário receiver estiver na mistura)")
+
+    server = None
+    url = args.url
+    if url is None:
+        backend = mock_server.build_backend(args)
+        faults = mock_server.faults_from(args) if args.latency_ms or args.jitter_ms or args.error_rate else None
+        server, url = mock_server.serve_in_thread(backend, faults=faults)
+        print(f"Backend local em {url}: {len(backend.users)} usuários, {len(backend.products)} produtos")
+
+    arrivals = plan_arrivals(args)
+    workers = max(1, min(args.workers, len(arrivals) or 1))
+    shares = [arrivals[i::workers] for i in range(workers)]
+    opts = {
+        "concurrency": args.concurrency, "browse": args.browse, "think_ms": args.think_ms, "create_prob": args.create_prob,
+        "donor_password": args.donor_password, "receiver_password": args.receiver_password,
+        "client_cache": args.client_cache, "breaker": args.breaker,
+    }
+    print(f"{len(arrivals)} sessões planejadas em {args.duration:.0f}s, {workers} processo(s) x {args.concurrency} sessões simultâneas")
+
+    start_at = time.time() + args.startup
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_worker, initargs=(url, opts)) as pool:
+            futures = [pool.submit(run_worker, share, start_at, opts) for share in shares]
+            results = [f.result() for f in futures]
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    report = merge(results, start_at)
+    report["args"] = {k: v for k, v in vars(args).items() if k not in ("spike",)}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    return 1 if report["failed_sessions"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
@@ -1,76 +1,1229 @@
+import time
+_STARTED = time.perf_counter()
+
 import flet as ft
+import asyncio
 import json
+import base64
+import codecs
 import os
 import uuid
-import requests
-from requests.exceptions import RequestException
+import atexit
+import threading
+import sqlite3
+import functools
+import itertools
+import random
+import re
+import bisect
+import unicodedata
+import types
+import contextvars
+import weakref
+import csv
+import io
+import httpx
+from urllib.parse import urlencode
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime
 
 API_URL = os.environ.get("API_URL", "http://localhost:8000")
 REQ_TIMEOUT = 0.5
-ACCESS_TOKEN = None
+
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(os.environ.get("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.environ.get("HTTP2", "0") == "1"
+TIMEOUT_MIN = max(REQ_TIMEOUT, float(os.environ.get("TIMEOUT_MIN", str(REQ_TIMEOUT))))  # nunca abaixo do timeout fixo antigo
+TIMEOUT_MAX = float(os.environ.get("TIMEOUT_MAX", "5"))
+GET_RETRIES = int(os.environ.get("GET_RETRIES", "2"))
+RETRY_BACKOFF = float(os.environ.get("RETRY_BACKOFF", "0.1"))
+RETRY_BACKOFF_MAX = float(os.environ.get("RETRY_BACKOFF_MAX", "1.0"))
+RETRY_STATUSES = (502, 503, 504)
+BREAKER_THRESHOLD = int(os.environ.get("BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "10"))
+FEED_CONCURRENCY = int(os.environ.get("FEED_CONCURRENCY", "8"))
+API_WORKERS = int(os.environ.get("API_WORKERS", "16"))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "512"))
+DISK_CACHE_PATH = os.environ.get("DISK_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.db"))
+DISK_CACHE_MAX_BYTES = int(os.environ.get("DISK_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+DISK_CACHE_SCHEMA = 2
+DONATION_JOURNAL_PATH = os.environ.get("DONATION_JOURNAL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "donations.journal"))
+DONATION_BATCH_SIZE = int(os.environ.get("DONATION_BATCH_SIZE", "20"))
+DONATION_RETRY_SECONDS = float(os.environ.get("DONATION_RETRY_SECONDS", "5"))
+UPDATE_FRAME_MS = float(os.environ.get("UPDATE_FRAME_MS", "16"))
+METRICS_EXPORT = os.environ.get("METRICS_EXPORT")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+APP_DEBUG = os.environ.get("APP_DEBUG", "0") == "1"
+APP_PROFILE = os.environ.get("APP_PROFILE")
+APP_PROFILE_TOP = int(os.environ.get("APP_PROFILE_TOP", "15"))
+APP_PROFILE_FRAMES = int(os.environ.get("APP_PROFILE_FRAMES", "5"))
+# Opcional: a primeira sincronização baixa os produtos de todos os receptores, o que anula o carregamento
+# sob demanda do feed em bases grandes. Vale para bases pequenas com muitas revisitas
+DELTA_SYNC = os.environ.get("DELTA_SYNC", "0") == "1"
+STREAM_CACHE_MAX_ITEMS = int(os.environ.get("STREAM_CACHE_MAX_ITEMS", "10000"))
+STREAM_QUEUE_BATCHES = 4
+STREAM_MAX_BATCH = 1024
+STREAM_REFRESH_SECONDS = 0.25
+DONATION_PAGE_SIZE = int(os.environ.get("DONATION_PAGE_SIZE", "25"))
+FAVORITES_SYNC_DELAY = float(os.environ.get("FAVORITES_SYNC_DELAY", "0.5"))
+BULK_IMPORT_CONCURRENCY = int(os.environ.get("BULK_IMPORT_CONCURRENCY", "8"))
+FEED_PAGE_SIZE = int(os.environ.get("FEED_PAGE_SIZE", "20"))
+FEED_VIEW_HEIGHT = 560
+STARTUP_REPORT = os.environ.get("STARTUP_REPORT", "0") == "1"
+FONT_REGULAR = "assets/fonts/Poppins-Regular.ttf"
+FONT_BOLD = "assets/fonts/Poppins-Bold.ttf"
+BG_IMAGE = "assets/01.png"
+BG_CACHE_DIR = os.environ.get("BG_CACHE_DIR", "assets/.cache")
+BG_SIZE_STEP = 256  # tamanhos de janela arredondados para cima: redimensionar não gera uma versão a cada pixel
+FEED_SCROLL_THRESHOLD = 300
+
+# Tempo de vida (s) das respostas GET em cache, por prefixo de endpoint
+CACHE_TTLS = {
+    "/receiver/get_products": 30,
+    "/donator/list_receivers/": 60,
+    "/donator/get_cause_products/": 60,
+    "/donator/favorites": 30,
+    "/donator/list_donations_made": 15,
+}
+
+# Respostas iguais para qualquer usuário: ficam numa única entrada de cache compartilhada por todas as sessões
+CACHE_SHARED = ("/donator/list_receivers/", "/donator/get_cause_products/")
+
+# Mutação bem-sucedida -> prefixos de GET que deixam de ser válidos
+CACHE_INVALIDATIONS = {
+    "/receiver/create_product": ("/receiver/get_products", "/donator/get_cause_products/"),
+    "/receiver/delete_product": ("/receiver/get_products", "/donator/get_cause_products/"),
+    "/donator/favorite/": ("/donator/favorites",),
+    "/donator/add_donation": ("/donator/list_donations_made",),
+    "/cadastrate": ("/donator/list_receivers/",),
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+_stats_lock = threading.Lock()
+POOL_STATS = {"requests": 0, "new_connections": 0, "reused_connections": 0, "failed": 0}
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def http_client(base_url=None):
+    # Um cliente (e um pool de conexões) por host, reutilizado por todas as chamadas api_*
+    base = base_url or API_URL
+    with _clients_lock:
+        client = _clients.get(base)
+        if client is None:
+            client = httpx.Client(
+                base_url=base,
+                http2=HTTP2_ENABLED and _http2_available(),
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_PER_HOST,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=REQ_TIMEOUT,
+            )
+            _clients[base] = client
+        return client
+
+def close_http_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+def pool_stats():
+    with _stats_lock:
+        stats = dict(POOL_STATS)
+    total = stats["new_connections"] + stats["reused_connections"]
+    stats["reuse_ratio"] = round(stats["reused_connections"] / total, 3) if total else 0.0
+    return stats
+
+def reset_pool_stats():
+    with _stats_lock:
+        for k in POOL_STATS:
+            POOL_STATS[k] = 0
+
+class ApiSession:
+    # Estado de um usuário logado. Cada DonationApp tem a sua; pool HTTP, cache de respostas, timeouts e
+    # circuit breaker continuam únicos no processo. As funções api_* usam a sessão ativa no contexto atual
+    def __init__(self, token=None):
+        self.token = token
+
+    def run(self, fn, *args):
+        # Executa fn (no thread atual) com esta sessão ativa
+        ctx = contextvars.copy_context()
+        ctx.run(_session.set, self)
+        return ctx.run(fn, *args)
+
+DEFAULT_SESSION = ApiSession()
+_session = contextvars.ContextVar("api_session", default=DEFAULT_SESSION)
+
+def current_session():
+    return _session.get()
+
+def cache_scope_for(path):
+    # Escopo do cache de GET: o token da sessão, ou None para respostas compartilhadas
+    return None if path.startswith(CACHE_SHARED) else current_session().token
+
+def disk_scope_for(path, email):
+    # Escopo no disco: o e-mail do usuário, ou "" (o mesmo da cópia do /donator/sync) para respostas compartilhadas
+    return "" if path.startswith(CACHE_SHARED) else email
 
 def _headers():
     h = {"Content-Type": "application/json"}
-    if ACCESS_TOKEN:
-        h["Authorization"] = f"Bearer {ACCESS_TOKEN}"
+    token = current_session().token
+    if token:
+        h["Authorization"] = f"Bearer {token}"
     return h
 
+class ResponseCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttls=None, invalidations=None):
+        self.max_entries = max_entries
+        self.ttls = CACHE_TTLS if ttls is None else ttls
+        self.invalidations = CACHE_INVALIDATIONS if invalidations is None else invalidations
+        self.entries = OrderedDict()  # (escopo, path) -> [expira_em, etag, dados]
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0, "invalidated": 0}
+
+    def ttl_for(self, path):
+        for prefix, ttl in self.ttls.items():
+            if path.startswith(prefix):
+                return ttl
+        return 0
+
+    def lookup(self, scope, path):
+        # Retorna (dados, etag, fresco); dados é None quando não há nada em cache
+        with self.lock:
+            entry = self.entries.get((scope, path))
+            if entry is None:
+                self.counters["misses"] += 1
+                return None, None, False
+            self.entries.move_to_end((scope, path))
+            if entry[0] > time.monotonic():
+                self.counters["hits"] += 1
+                return entry[2], entry[1], True
+            self.counters["misses"] += 1
+            return entry[2], entry[1], False
+
+    def store(self, scope, path, data, etag=None):
+        ttl = self.ttl_for(path)
+        if ttl <= 0 or data is None:
+            return
+        with self.lock:
+            self.entries[(scope, path)] = [time.monotonic() + ttl, etag, data]
+            self.entries.move_to_end((scope, path))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def touch(self, scope, path):
+        # Resposta 304: o conteúdo em cache continua válido por mais um TTL
+        with self.lock:
+            entry = self.entries.get((scope, path))
+            if entry is not None:
+                entry[0] = time.monotonic() + self.ttl_for(path)
+                self.counters["revalidated"] += 1
+
+    def invalidate(self, *prefixes):
+        with self.lock:
+            stale = [k for k in self.entries if k[1].startswith(prefixes)]
+            for k in stale:
+                del self.entries[k]
+            self.counters["invalidated"] += len(stale)
+
+    def invalidate_for(self, mutation_path):
+        for prefix, targets in self.invalidations.items():
+            if mutation_path.startswith(prefix):
+                self.invalidate(*targets)
+
+    def clear(self, scope=None):
+        with self.lock:
+            if scope is None:
+                self.entries.clear()
+            else:
+                for k in [k for k in self.entries if k[0] == scope]:
+                    del self.entries[k]
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters, size=len(self.entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+RESPONSE_CACHE = ResponseCache()
+
+class DiskStore:
+    # Últimas respostas conhecidas (receptores e produtos) persistidas em SQLite para abrir as telas sem esperar a rede
+    def __init__(self, path=DISK_CACHE_PATH, max_bytes=DISK_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = None
+        # O arquivo só é aberto no primeiro uso (ou no pré-aquecimento), fora do caminho do primeiro quadro
+        self.opened = not path
+
+    def connection(self):
+        if not self.opened:
+            with self.lock:
+                if not self.opened:
+                    self.conn = self._connect()
+                    self.opened = True
+        return self.conn
+
+    def _connect(self):
+        try:
+            return self._open()
+        except sqlite3.DatabaseError:
+            # Arquivo corrompido ou de outro formato: descarta e recomeça
+            try:
+                os.remove(self.path)
+                return self._open()
+            except (OSError, sqlite3.DatabaseError):
+                return None
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != DISK_CACHE_SCHEMA:
+            conn.execute("DROP TABLE IF EXISTS entries")
+            conn.execute(f"PRAGMA user_version = {DISK_CACHE_SCHEMA}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "scope TEXT NOT NULL, path TEXT NOT NULL, body TEXT NOT NULL, "
+            "size INTEGER NOT NULL, updated REAL NOT NULL, PRIMARY KEY (scope, path))"
+        )
+        conn.commit()
+        return conn
+
+    def get(self, scope, path):
+        if self.connection() is None:
+            return None
+        with self.lock:
+            try:
+                row = self.conn.execute("SELECT body FROM entries WHERE scope = ? AND path = ?", (scope, path)).fetchone()
+            except sqlite3.DatabaseError:
+                return None
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def put(self, scope, path, data):
+        if data is None or self.connection() is None:
+            return
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            try:
+                row = self.conn.execute("SELECT body FROM entries WHERE scope = ? AND path = ?", (scope, path)).fetchone()
+                if row is not None and row[0] == body:
+                    return  # Nada mudou: evita reescrever e sincronizar o arquivo
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (scope, path, body, size, updated) VALUES (?, ?, ?, ?, ?)",
+                    (scope, path, body, size, time.time()),
+                )
+                self._evict()
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                pass
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while total > self.max_bytes:
+            row = self.conn.execute("SELECT scope, path, size FROM entries ORDER BY updated ASC LIMIT 1").fetchone()
+            if row is None:
+                break
+            self.conn.execute("DELETE FROM entries WHERE scope = ? AND path = ?", (row[0], row[1]))
+            total -= row[2]
+
+    def clear(self, scope=None):
+        if self.connection() is None:
+            return
+        with self.lock:
+            if scope is None:
+                self.conn.execute("DELETE FROM entries")
+            else:
+                self.conn.execute("DELETE FROM entries WHERE scope = ?", (scope,))
+            self.conn.commit()
+
+DISK_STORE = DiskStore(DISK_CACHE_PATH if os.environ.get("DISK_CACHE", "1") == "1" else None)
+
+class Histogram:
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, sample_size=1024):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(self.BUCKETS)
+        self.samples = deque(maxlen=sample_size)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+    def percentile(self, q):
+        # Quantil pelas amostras mais recentes (janela limitada)
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 2),
+            "p95_ms": round(self.percentile(0.95) * 1000, 2),
+            "p99_ms": round(self.percentile(0.99) * 1000, 2),
+        }
+
+def endpoint_label(method, path):
+    # /donator/get_cause_products/123 -> GET /donator/get_cause_products/{id}
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    return f"{method} /" + "/".join(parts[:2] + ["{id}"] * (len(parts) - 2))
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.views = {}
+
+    def _endpoint(self, label):
+        ep = self.endpoints.get(label)
+        if ep is None:
+            ep = self.endpoints[label] = {
+                "latency": Histogram(), "status": {}, "timeouts": 0, "errors": 0, "bytes_sent": 0, "bytes_received": 0,
+            }
+        return ep
+
+    def observe_request(self, method, path, seconds, status=None, error=None, sent=0, received=0):
+        with self.lock:
+            ep = self._endpoint(endpoint_label(method, path))
+            ep["latency"].observe(seconds)
+            ep["bytes_sent"] += sent
+            ep["bytes_received"] += received
+            if status is not None:
+                ep["status"][status] = ep["status"].get(status, 0) + 1
+            elif isinstance(error, httpx.TimeoutException):
+                ep["timeouts"] += 1
+            else:
+                ep["errors"] += 1
+
+    def observe_view(self, name, seconds):
+        with self.lock:
+            hist = self.views.get(name)
+            if hist is None:
+                hist = self.views[name] = Histogram()
+            hist.observe(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            endpoints = {
+                label: dict(ep["latency"].summary(), status={str(k): v for k, v in sorted(ep["status"].items())},
+                            timeouts=ep["timeouts"], errors=ep["errors"],
+                            bytes_sent=ep["bytes_sent"], bytes_received=ep["bytes_received"])
+                for label, ep in sorted(self.endpoints.items())
+            }
+            views = {name: hist.summary() for name, hist in sorted(self.views.items())}
+        return {
+            "endpoints": endpoints, "views": views, "pool": pool_stats(), "cache": RESPONSE_CACHE.stats(),
+            "breaker": breaker_for().stats(), "timeouts": TIMEOUTS.snapshot(), "startup": dict(STARTUP),
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def prometheus(self):
+        # Formato texto 0.0.4: cada família sai inteira, sob um único HELP/TYPE, antes da próxima
+        families = OrderedDict()
+
+        def family(name, kind, help_text):
+            families[name] = (kind, help_text, [])
+            return families[name][2]
+
+        def histogram(samples, name, labels, hist):
+            for bound, n in zip(Histogram.BUCKETS, hist.buckets):
+                samples.append(f'{name}_bucket{{{labels},le="{bound}"}} {n}')
+            samples.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            samples.append(f"{name}_sum{{{labels}}} {hist.total:.6f}")
+            samples.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        latency = family("app_request_seconds", "histogram", "Duração das requisições HTTP por endpoint")
+        statuses = family("app_request_status_total", "counter", "Respostas HTTP por endpoint e status")
+        timeouts = family("app_request_timeouts_total", "counter", "Requisições encerradas por timeout")
+        errors = family("app_request_errors_total", "counter", "Requisições que falharam sem resposta")
+        traffic = family("app_request_bytes_total", "counter", "Bytes enviados e recebidos por endpoint")
+        views = family("app_view_seconds", "histogram", "Tempo de montagem das telas")
+        with self.lock:
+            for label, ep in sorted(self.endpoints.items()):
+                method, path = label.split(" ", 1)
+                labels = f'method="{method}",endpoint="{path}"'
+                histogram(latency, "app_request_seconds", labels, ep["latency"])
+                for status, n in sorted(ep["status"].items()):
+                    statuses.append(f'app_request_status_total{{{labels},status="{status}"}} {n}')
+                timeouts.append(f"app_request_timeouts_total{{{labels}}} {ep['timeouts']}")
+                errors.append(f"app_request_errors_total{{{labels}}} {ep['errors']}")
+                traffic.append(f'app_request_bytes_total{{{labels},direction="sent"}} {ep["bytes_sent"]}')
+                traffic.append(f'app_request_bytes_total{{{labels},direction="received"}} {ep["bytes_received"]}')
+            for name, hist in sorted(self.views.items()):
+                histogram(views, "app_view_seconds", f'view="{name}"', hist)
+        for prefix, stats, help_text in (("app_http_pool_", pool_stats(), "Pool de conexões HTTP"),
+                                         ("app_cache_", RESPONSE_CACHE.stats(), "Cache de GET")):
+            for key, value in stats.items():
+                kind = "gauge" if key == "size" or key.endswith("_ratio") else "counter"
+                family(prefix + key, kind, f"{help_text}: {key}").append(f"{prefix}{key} {value}")
+        breaker = breaker_for().stats()
+        family("app_breaker_open", "gauge", "1 com o circuito aberto ou em sondagem").append(
+            f"app_breaker_open {1 if breaker['state'] != 'closed' else 0}")
+        family("app_breaker_opened_total", "counter", "Vezes que o circuito abriu").append(
+            f"app_breaker_opened_total {breaker['opened']}")
+        family("app_breaker_rejected_total", "counter", "Requisições recusadas com o circuito aberto").append(
+            f"app_breaker_rejected_total {breaker['rejected']}")
+        adaptive = family("app_request_timeout_seconds", "gauge", "Timeout adaptativo atual por endpoint")
+        for label, timeout in TIMEOUTS.snapshot().items():
+            method, path = label.split(" ", 1)
+            adaptive.append(f'app_request_timeout_seconds{{method="{method}",endpoint="{path}"}} {timeout}')
+        startup = family("app_startup_ms", "gauge", "Marcas da inicialização em ms desde o import de main")
+        for phase, ms in STARTUP.items():
+            startup.append(f'app_startup_ms{{phase="{phase}"}} {ms}')
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus() if path.endswith((".prom", ".txt")) else self.to_json())
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+            self.views.clear()
+
+METRICS = Metrics()
+
+def timed_view(fn):
+    # Registra em METRICS quanto tempo cada tela (ou carga assíncrona de tela) leva para ser montada
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                METRICS.observe_view(fn.__name__, time.perf_counter() - started)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            METRICS.observe_view(fn.__name__, time.perf_counter() - started)
+    return wrapper
+
+_profile_seq = 0
+_profile_lock = threading.Lock()
+_trace_depth = 0
+_trace_owned = False
+_profile_local = threading.local()  # quantas ações perfiladas estão abertas nesta thread
+
+if APP_PROFILE:
+    import cProfile
+    import linecache
+    import pstats
+    import tracemalloc
+    os.makedirs(APP_PROFILE, exist_ok=True)
+
+def _trace_begin():
+    # O tracemalloc só fica ligado enquanto alguma ação perfilada está em andamento,
+    # assim o snapshot final contém apenas o que foi alocado (e continua vivo) durante ela
+    global _trace_depth, _trace_owned
+    with _profile_lock:
+        if _trace_depth == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(APP_PROFILE_FRAMES)
+            _trace_owned = True
+        _trace_depth += 1
+
+def _trace_end():
+    global _trace_depth, _trace_owned
+    with _profile_lock:
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        _trace_depth -= 1
+        if _trace_depth == 0 and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+    return snapshot
+
+def _collapsed_stacks(stats):
+    # Converte o grafo de chamadas do pstats em pilhas "a;b;c microssegundos" (formato do flamegraph.pl/speedscope)
+    entries = stats.stats
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in entries.items():
+        for caller, caller_stats in callers.items():
+            callees.setdefault(caller, []).append((func, caller_stats[3]))
+    lines = {}
+
+    def label(func):
+        filename, line, name = func
+        return f"{os.path.basename(filename)}:{name}:{line}" if line else name
+
+    def walk(func, path, on_path, share):
+        tt = entries[func][2]
+        stack = path + (label(func),)
+        self_us = int(tt * share * 1e6)
+        if self_us:
+            key = ";".join(stack)
+            lines[key] = lines.get(key, 0) + self_us
+        if len(stack) >= 64:
+            return
+        for callee, callee_ct in callees.get(func, ()):
+            total = entries[callee][3]
+            if callee in on_path or total <= 0 or callee_ct * share < 1e-6:
+                continue
+            walk(callee, stack, on_path | {callee}, min(1.0, callee_ct * share / total))
+
+    for func, (cc, nc, tt, ct, callers) in entries.items():
+        if not callers:
+            walk(func, (), {func}, 1.0)
+    return "\n".join(f"{stack} {us}" for stack, us in sorted(lines.items())) + "\n"
+
+def _write_profile(name, profile, snapshot):
+    global _profile_seq
+    with _profile_lock:
+        _profile_seq += 1
+        base = os.path.join(APP_PROFILE, f"{time.strftime('%Y%m%d-%H%M%S')}-{_profile_seq:04d}-{name}")
+    stats = pstats.Stats(profile)
+    stats.dump_stats(base + ".prof")
+    with open(base + ".collapsed", "w", encoding="utf-8") as f:
+        f.write(_collapsed_stacks(stats))
+    if snapshot is None:
+        return
+    # Descarta o que o próprio profiler alocou ao gravar ações aninhadas
+    own = [(fn.__code__.co_filename, fn.__code__.co_firstlineno, max(l for _, _, l in fn.__code__.co_lines() if l))
+           for fn in (_collapsed_stacks, _write_profile)]
+    skip = {m.__file__ for m in (tracemalloc, linecache, cProfile, pstats)}
+    stats = (s for s in snapshot.statistics("traceback")
+             if s.traceback[-1].filename not in skip
+             and not any(fr.filename == name and lo <= fr.lineno <= hi for fr in s.traceback for name, lo, hi in own))
+    with open(base + ".alloc.txt", "w", encoding="utf-8") as f:
+        for stat in itertools.islice(stats, APP_PROFILE_TOP):
+            f.write(f"{stat.size / 1024:.1f} KiB em {stat.count} blocos\n")
+            for line in stat.traceback.format()[-6:]:
+                f.write(f"    {line}\n")
+
+def _profile_enter(profile):
+    # Só a ação mais externa da thread liga o cProfile (no 3.12+ um segundo enable levanta ValueError);
+    # as aninhadas (do_login -> show_home -> show_donor_feed) ficam registradas dentro do perfil dela
+    depth = getattr(_profile_local, "depth", 0)
+    _profile_local.depth = depth + 1
+    if depth:
+        return False
+    profile.enable()
+    return True
+
+def _profile_exit(profile, owned):
+    _profile_local.depth -= 1
+    if owned:
+        profile.disable()
+
+@types.coroutine
+def _step_profiled(coro, profile, ran):
+    # Liga o profiler só enquanto a corrotina executa, não durante os awaits (quando outras tarefas rodam)
+    value, error = None, None
+    while True:
+        owned = _profile_enter(profile)
+        ran[0] = ran[0] or owned
+        try:
+            yielded = coro.throw(error) if error is not None else coro.send(value)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            _profile_exit(profile, owned)
+        try:
+            value, error = (yield yielded), None
+        except BaseException as exc:
+            value, error = None, exc
+
+def profiled(fn):
+    # Com APP_PROFILE vazio a função é devolvida intacta: nenhum custo fora do modo de profiling
+    if not APP_PROFILE:
+        return fn
+    name = fn.__qualname__.replace("DonationApp.", "").replace(".<locals>", "")
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            profile = cProfile.Profile()
+            ran = [False]
+            _trace_begin()
+            try:
+                return await _step_profiled(fn(*args, **kwargs), profile, ran)
+            finally:
+                snapshot = _trace_end()
+                if ran[0]:
+                    _write_profile(name, profile, snapshot)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = cProfile.Profile()
+        _trace_begin()
+        owned = _profile_enter(profile)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _profile_exit(profile, owned)
+            snapshot = _trace_end()
+            if owned:
+                _write_profile(name, profile, snapshot)
+    return wrapper
+
+def serve_metrics(port, host="127.0.0.1"):
+    # /metrics em texto Prometheus e /metrics.json em JSON, numa thread daemon
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, ctype = METRICS.to_json().encode("utf-8"), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, ctype = METRICS.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+class AdaptiveTimeouts:
+    # Timeout por endpoint no estilo do RTO do TCP: média suavizada + 4x o desvio, dobrando a cada estouro.
+    # Só GET (que tem retry) pode encolher: um POST cortado cedo já pode ter sido gravado no servidor
+    def __init__(self, initial=REQ_TIMEOUT, low=TIMEOUT_MIN, high=TIMEOUT_MAX):
+        self.initial = initial
+        self.low = low
+        self.high = high
+        self.lock = threading.Lock()
+        self.state = {}  # endpoint -> [srtt, rttvar, timeout]
+
+    def get(self, label):
+        with self.lock:
+            entry = self.state.get(label)
+            return entry[2] if entry else self.initial
+
+    def observe(self, label, seconds):
+        with self.lock:
+            entry = self.state.get(label)
+            if entry is None:
+                srtt, rttvar = seconds, seconds / 2
+            else:
+                srtt, rttvar = entry[0], entry[1]
+                rttvar = 0.75 * rttvar + 0.25 * abs(srtt - seconds)
+                srtt = 0.875 * srtt + 0.125 * seconds
+            timeout = min(self.high, max(self.low, srtt + 4 * rttvar))
+            if entry is not None and not label.startswith("GET "):
+                timeout = max(timeout, entry[2])
+            self.state[label] = [srtt, rttvar, timeout]
+
+    def backoff(self, label):
+        with self.lock:
+            entry = self.state.setdefault(label, [self.initial, self.initial / 2, self.initial])
+            entry[2] = min(self.high, entry[2] * 2)
+
+    def snapshot(self):
+        with self.lock:
+            return {label: round(entry[2], 3) for label, entry in sorted(self.state.items())}
+
+class CircuitOpenError(httpx.TransportError):
+    pass
+
+class CircuitBreaker:
+    # closed -> open após N falhas seguidas; depois do cooldown deixa passar uma sondagem (half_open)
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.counters = {"opened": 0, "rejected": 0}
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self.probing = False
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.counters["opened"] += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, state=self.state, failures=self.failures)
+
+TIMEOUTS = AdaptiveTimeouts()
+_breakers = {}
+
+def breaker_for(base_url=None):
+    base = base_url or API_URL
+    with _clients_lock:
+        breaker = _breakers.get(base)
+        if breaker is None:
+            breaker = _breakers[base] = CircuitBreaker()
+        return breaker
+
+def _retry_delay(attempt):
+    # Backoff exponencial com jitter completo
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * (2 ** attempt)))
+
+def _send(method, path, payload=None, headers=None, stream=False):
+    label = endpoint_label(method, path)
+    breaker = breaker_for()
+    if not breaker.allow():
+        raise CircuitOpenError(f"circuito aberto para {API_URL}")
+    opened = []
+
+    def trace(event, info):
+        if event == "connection.connect_tcp.complete":
+            opened.append(event)
+
+    h = _headers()
+    if headers:
+        h.update(headers)
+    kwargs = {"headers": h, "timeout": TIMEOUTS.get(label), "extensions": {"trace": trace}}
+    if payload is not None:
+        kwargs["json"] = payload
+    ok = False
+    r = None
+    error = None
+    started = time.perf_counter()
+    try:
+        client = http_client()
+        if stream:
+            # O corpo fica por ler; quem chamou registra as métricas ao fechar a resposta
+            r = client.send(client.build_request(method, path, **kwargs), stream=True)
+        else:
+            r = client.request(method, path, **kwargs)
+        ok = True
+        TIMEOUTS.observe(label, time.perf_counter() - started)
+        if r.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return r
+    except httpx.HTTPError as exc:
+        error = exc
+        if isinstance(exc, httpx.TimeoutException):
+            TIMEOUTS.backoff(label)
+        breaker.record_failure()
+        raise
+    finally:
+        if not (stream and ok):
+            METRICS.observe_request(
+                method, path, time.perf_counter() - started,
+                status=r.status_code if r is not None else None, error=error,
+                sent=len(r.request.content) if r is not None else 0,
+                received=len(r.content) if r is not None else 0,
+            )
+        with _stats_lock:
+            POOL_STATS["requests"] += 1
+            if opened:
+                POOL_STATS["new_connections"] += 1
+            elif ok:
+                POOL_STATS["reused_connections"] += 1
+            if not ok:
+                POOL_STATS["failed"] += 1
+
+def _report_pool_stats():
+    if os.environ.get("HTTP_POOL_STATS") == "1":
+        print("HTTP pool:", pool_stats())
+        print("GET cache:", RESPONSE_CACHE.stats())
+    if METRICS_EXPORT:
+        try:
+            METRICS.export(METRICS_EXPORT)
+        except OSError as exc:
+            print("Falha ao exportar métricas:", exc)
+    close_http_clients()
+
+atexit.register(_report_pool_stats)
+
 def float_format(value)-> float:
-    str(value).replace(",",".")
-    return float(value)
+    # Aceita "12.50", "12,50", "1.234,56" e "1.234.567". Separador ambíguo ("1.000", "1,000") ou misturado
+    # fora do padrão brasileiro ("1,234.56") levanta ValueError em vez de virar silenciosamente outro número
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)  # número do JSON ou já convertido: reler str(12.125) o tomaria por milhar
+    text = str(value).strip()
+    digits = text.lstrip("+-")
+    if "," in digits and "." in digits:
+        if not re.fullmatch(r"\d{1,3}(\.\d{3})+,\d+", digits):
+            raise ValueError(f"separadores inconsistentes em {text} (use 1.234,56)")
+        text = text.replace(".", "").replace(",", ".")
+    elif digits.count(",") > 1:
+        raise ValueError(f"mais de uma vírgula em {text}")
+    elif digits.count(".") > 1:
+        if not re.fullmatch(r"\d{1,3}(\.\d{3})+", digits):
+            raise ValueError(f"separadores de milhar inconsistentes em {text}")
+        text = text.replace(".", "")
+    elif re.fullmatch(r"[1-9]\d{0,2}[.,]\d{3}", digits):
+        raise ValueError(f"separador ambíguo em {text}: escreva 1.000,00 (mil) ou 1,00 (um)")
+    else:
+        text = text.replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"{value} não é um número") from None
+
+# Nomes de coluna aceitos na importação em lote (CSV ou JSON no formato de "causes" do data.json)
+IMPORT_FIELDS = {
+    "title": ("title", "titulo", "título", "name", "nome", "productname"),
+    "description": ("description", "descricao", "descrição"),
+    "value": ("value", "valor"),
+}
+
+def _import_row(record):
+    fields = {str(k).strip().lower(): v for k, v in record.items() if k is not None}
+    row = {}
+    for field, names in IMPORT_FIELDS.items():
+        row[field] = next((fields[n] for n in names if fields.get(n) not in (None, "")), None)
+    title = str(row["title"] or "").strip()
+    if not title:
+        raise ValueError("título vazio")
+    if row["value"] is None:
+        raise ValueError("valor vazio")
+    try:
+        value = float_format(row["value"])
+    except ValueError as exc:
+        raise ValueError(f"valor inválido: {exc}") from None
+    if not value > 0:
+        raise ValueError(f"valor deve ser positivo: {row['value']}")
+    return {"title": title, "description": str(row["description"] or "").strip(), "value": value}
+
+def _csv_header_error(fieldnames):
+    # Sem cabeçalho a primeira linha de dados vira nome de coluna e nenhuma linha seria reconhecida
+    names = {str(n or "").strip().lower() for n in fieldnames or ()}
+    missing = [field for field in ("title", "value") if not names.intersection(IMPORT_FIELDS[field])]
+    if not missing:
+        return None
+    return (f"cabeçalho ausente ou desconhecido (falta a coluna {' e '.join(missing)}): a primeira linha "
+            f"deve ter as colunas title;description;value ou titulo;descricao;valor")
+
+def _csv_field_error(record, columns):
+    # O DictReader põe campos a mais na chave None e preenche os que faltam com None: sem esta checagem
+    # "Arroz,Cesta básica,12,50" entraria como 12.0
+    if None in record:
+        return (f"{columns + len(record[None])} campos, esperados {columns} "
+                f"(valor com vírgula decimal precisa de aspas ou de ; como separador)")
+    if None in record.values():
+        return f"{sum(v is not None for v in record.values())} campos, esperados {columns}"
+    return None
+
+def read_import_file(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252")  # CSV salvo pelo Excel em português
+
+def parse_product_rows(text):
+    # Retorna (linhas válidas, erros), ambas como (nº da linha ou item, ...), validadas antes de qualquer envio
+    text = (text or "").strip()
+    if not text:
+        return [], []
+    columns = None  # só no CSV: quantos campos cada linha deve ter
+    if text[0] in "[{":
+        try:
+            data = json.loads(text)
+        except ValueError as exc:
+            return [], [(1, f"JSON inválido: {exc}")]
+        if isinstance(data, dict):
+            data = data.get("causes", next((v for v in data.values() if isinstance(v, list)), None))
+        if not isinstance(data, list):
+            return [], [(1, "JSON sem lista de produtos: use uma lista ou o formato de causes do data.json")]
+        records = [(i, d) for i, d in enumerate(data, 1)]
+    else:
+        try:
+            dialect = csv.Sniffer().sniff(text.splitlines()[0], delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+        problem = _csv_header_error(reader.fieldnames)
+        if problem:
+            return [], [(1, problem)]
+        try:
+            records = [(reader.line_num, d) for d in reader]
+        except csv.Error as exc:
+            return [], [(reader.line_num, f"CSV inválido: {exc}")]
+        columns = len(reader.fieldnames)
+    rows, errors = [], []
+    for line, record in records:
+        if not isinstance(record, dict):
+            errors.append((line, "registro não é um objeto"))
+            continue
+        problem = columns is not None and _csv_field_error(record, columns)
+        if problem:
+            errors.append((line, problem))
+            continue
+        try:
+            rows.append((line, _import_row(record)))
+        except ValueError as exc:
+            errors.append((line, str(exc)))
+    return rows, errors
+
+_inflight = {}
+_inflight_lock = threading.Lock()
 
 def api_get(path):
+    scope = cache_scope_for(path)
+    cached, etag, fresh = RESPONSE_CACHE.lookup(scope, path)
+    if fresh:
+        return cached
+    # Chamadas simultâneas ao mesmo GET (aquecimento pós-login e a tela abrindo) compartilham uma única requisição
+    with _inflight_lock:
+        call = _inflight.get((scope, path))
+        leader = call is None
+        if leader:
+            call = _inflight[(scope, path)] = [threading.Event(), None]
+    if not leader:
+        call[0].wait()
+        return call[1]
     try:
-        r = requests.get(f"{API_URL}{path}", headers=_headers(), timeout=REQ_TIMEOUT)
-        if r.status_code in (200, 201):
+        call[1] = _fetch(scope, path, cached, etag)
+    finally:
+        with _inflight_lock:
+            _inflight.pop((scope, path), None)
+        call[0].set()
+    return call[1]
+
+def _get_retrying(path, headers=None, stream=False):
+    # GET é idempotente: falhas de rede e 502/503/504 são repetidas. Devolve a última resposta, ou None
+    # com o circuito aberto ou quando nenhuma tentativa obteve resposta
+    for attempt in range(GET_RETRIES + 1):
+        try:
+            r = _send("GET", path, headers=headers, stream=stream)
+        except CircuitOpenError:
+            return None
+        except httpx.HTTPError:
+            if attempt < GET_RETRIES:
+                time.sleep(_retry_delay(attempt))
+                continue
+            return None
+        if r.status_code in RETRY_STATUSES and attempt < GET_RETRIES:
+            if stream:
+                r.close()
+            time.sleep(_retry_delay(attempt))
+            continue
+        return r
+
+def _fetch(scope, path, cached, etag):
+    # Com o circuito aberto (ou esgotadas as tentativas) devolve o que houver em cache, mesmo vencido
+    r = _get_retrying(path, headers={"If-None-Match": etag} if etag else None)
+    if r is None or r.status_code in RETRY_STATUSES:
+        return cached
+    if r.status_code == 304 and cached is not None:
+        RESPONSE_CACHE.touch(scope, path)
+        return cached
+    if r.status_code in (200, 201):
+        try:
+            data = r.json()
+        except Exception:
+            return {"status": "ok"}
+        RESPONSE_CACHE.store(scope, path, data, r.headers.get("ETag"))
+        return data
+    return None
+
+JSON_NUMBER_CHARS = "0123456789+-.eE"
+
+def iter_json_array(chunks):
+    # Lê um array JSON elemento a elemento conforme os bytes chegam; só o trecho ainda não consumido fica em memória.
+    # Se o corpo não for um array (ex.: {"receivers": [...]}) cai para o parse completo
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    started = False
+    whole = None
+    for chunk in itertools.chain(chunks, [None]):
+        final = chunk is None
+        buf += utf8.decode(b"" if final else chunk, final=final)
+        if whole is not None:
+            whole.append(buf)
+            buf = ""
+            continue
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    whole = [buf]
+                    buf = ""
+                    break
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
             try:
-                return r.json()
-            except Exception:
-                return {"status": "ok"}
-        return None
-    except RequestException:
-        return None
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if final:
+                    raise
+                break
+            if not final and isinstance(item, (int, float)) and not isinstance(item, bool) \
+                    and not buf[end:].strip(JSON_NUMBER_CHARS):
+                break  # número encostado no fim do buffer ("12", "6.", "1e"): pode continuar no próximo pedaço
+            pos = end
+            yield item
+        buf = buf[pos:]
+        pos = 0
+    if whole is not None:
+        data = json.loads("".join(whole))
+        if isinstance(data, dict):
+            data = next((v for v in data.values() if isinstance(v, list)), [])
+        yield from data if isinstance(data, list) else ()
+    elif started:
+        raise ValueError("array JSON incompleto")
+
+def api_stream(path, cls):
+    # GET em modo streaming: produz registros normalizados enquanto o corpo ainda está chegando.
+    # Respostas até STREAM_CACHE_MAX_ITEMS itens também vão para o cache; maiores não ficam retidas
+    scope = cache_scope_for(path)
+    cached, etag, fresh = RESPONSE_CACHE.lookup(scope, path)
+    with _inflight_lock:
+        call = _inflight.get((scope, path))
+    if call is not None:
+        # Um GET comum do mesmo recurso já está a caminho (ex.: aquecimento pós-login): aproveita o resultado
+        call[0].wait()
+        cached, fresh = call[1], call[1] is not None
+    if fresh:
+        yield from records_from(cached, cls)
+        return
+    r = _get_retrying(path, headers={"If-None-Match": etag} if etag else None, stream=True)
+    if r is None or r.status_code not in (200, 201, 304) or (r.status_code == 304 and cached is None):
+        if r is not None:
+            r.close()
+        if cached is None:
+            raise httpx.HTTPError(f"falha ao buscar {path}")
+        yield from records_from(cached, cls)
+        return
+
+    error = None
+    try:
+        if r.status_code == 304:
+            RESPONSE_CACHE.touch(scope, path)
+            yield from records_from(cached, cls)
+            return
+        keep = []
+        for item in iter_json_array(r.iter_bytes()):
+            if keep is not None:
+                keep.append(item)
+                if len(keep) > STREAM_CACHE_MAX_ITEMS:
+                    keep = None
+            if isinstance(item, dict):
+                yield cls.from_api(item)
+        if keep is not None:
+            RESPONSE_CACHE.store(scope, path, keep, r.headers.get("ETag"))
+    except (httpx.HTTPError, ValueError) as exc:
+        error = exc
+        raise
+    finally:
+        r.close()
+        METRICS.observe_request(
+            "GET", path, r.elapsed.total_seconds(),
+            status=r.status_code, error=error, sent=0, received=r.num_bytes_downloaded,
+        )
 
-def api_post(path, payload):
+def api_post(path, payload, headers=None):
     try:
-        r = requests.post(f"{API_URL}{path}", json=payload, headers=_headers(), timeout=REQ_TIMEOUT)
+        r = _send("POST", path, payload, headers)
         if r.status_code == 409:
             return {"error": "conflict"}
         if 200 <= r.status_code < 300:
+            RESPONSE_CACHE.invalidate_for(path)
             try:
                 return r.json()
             except:
                 return {"status": "ok"}
         return {"error": r.status_code}
-    except RequestException:
+    except httpx.HTTPError:
         return None
 
 def api_put(path, payload):
     try:
-        r = requests.put(f"{API_URL}{path}", json=payload, headers=_headers(), timeout=REQ_TIMEOUT)
+        r = _send("PUT", path, payload)
         if 200 <= r.status_code < 300:
+            RESPONSE_CACHE.invalidate_for(path)
             try:
                 return r.json()
             except Exception:
                 return {"status": "ok"}
         return None
-    except RequestException:
+    except httpx.HTTPError:
         return None
 
 def api_delete(path, payload=None):
     try:
-        if payload is not None:
-            r = requests.delete(f"{API_URL}{path}", json=payload, headers=_headers(), timeout=REQ_TIMEOUT)
-        else:
-            r = requests.delete(f"{API_URL}{path}", headers=_headers(), timeout=REQ_TIMEOUT)
+        r = _send("DELETE", path, payload)
         if 200 <= r.status_code < 300:
+            RESPONSE_CACHE.invalidate_for(path)
             try:
                 return r.json()
             except Exception:
                 return {"status": "ok"}
         return None
-    except RequestException:
+    except httpx.HTTPError:
         return None
 
 def api_login(email, password):
@@ -106,7 +1259,7 @@ def api_create_product(prod):
         "CauseId" : 0,
         "Name": prod.get("title"),
         "Description": prod.get("description"),
-        "Value": float_format(prod.get("value"))
+        "Value": prod.get("value")  # já convertido por float_format no formulário ou na importação
     }
     return api_post("/receiver/create_product", payload)
 
@@ -119,6 +1272,9 @@ def api_get_products():
 def api_list_receivers(order_type="name_asc"):
     return api_get(f"/donator/list_receivers/{order_type}")
 
+def api_stream_receivers(order_type="name_asc"):
+    return api_stream(f"/donator/list_receivers/{order_type}", Receiver)
+
 def api_favorite_cause(cause_id):
     return api_post(f"/donator/favorite/{cause_id}", {})
 
@@ -128,15 +1284,937 @@ def api_remove_favorite(fav_id):
 def api_list_favorites():
     return api_get("/donator/favorites")
 
-def api_add_donation(donation_payload):
-    return api_post("/donator/add_donation", donation_payload)
+def api_add_donation(donation_payload, idempotency_key=None):
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+    return api_post("/donator/add_donation", donation_payload, headers)
 
 def api_list_donations_made():
     return api_get("/donator/list_donations_made")
 
+def api_list_donations_page(cursor=None, limit=DONATION_PAGE_SIZE):
+    # O cursor é opaco (pode trazer &, + ou =): a query é sempre codificada
+    query = {"limit": limit}
+    if cursor:
+        query["cursor"] = cursor
+    return api_get("/donator/list_donations_made?" + urlencode(query))
+
 def api_get_cause_products(causeId):
     return api_get(f"/donator/get_cause_products/{causeId}")
 
+def api_sync(since=None):
+    # Retorna (status, corpo); status None quando não houve resposta. O token é opaco: vai codificado na URL
+    r = _get_retrying("/donator/sync?" + urlencode({"since": since or 0}))
+    if r is None:
+        return None, None
+    try:
+        return r.status_code, r.json()
+    except ValueError:
+        return r.status_code, None
+
+def to_float(value):
+    try:
+        return float(str(value).replace(",", ".")) if value not in (None, "") else 0.0
+    except ValueError:
+        return 0.0
+
+class Record:
+    # Registros normalizados: cada formato de payload da API é lido uma vez e as telas só trabalham com atributos
+    __slots__ = ()
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.astuple() == other.astuple()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.astuple())
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.astuple()!r}"
+
+class Receiver(Record):
+    __slots__ = ("id", "name", "description")
+
+    def __init__(self, id, name="", description=""):
+        self.id = id
+        self.name = name
+        self.description = description
+
+    def to_api(self):
+        return {"UserId": self.id, "Name": self.name, "Description": self.description}
+
+    @classmethod
+    def from_api(cls, d):
+        return cls(
+            d.get("UserId") or d.get("id_usuario") or d.get("Id"),
+            d.get("Name") or d.get("nome") or "",
+            d.get("Description") or d.get("descricao") or "",
+        )
+
+class Product(Record):
+    __slots__ = ("id", "name", "description", "value")
+
+    def __init__(self, id, name="", description="", value=0.0):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.value = value
+
+    @classmethod
+    def from_api(cls, d):
+        return cls(
+            d.get("ProductId") or d.get("id"),
+            d.get("ProductName") or d.get("name") or d.get("title") or "",
+            d.get("Description") or d.get("description") or "",
+            to_float(d.get("Value") if d.get("Value") is not None else d.get("value")),
+        )
+
+    def to_api(self):
+        return {"ProductId": self.id, "ProductName": self.name, "Description": self.description, "Value": self.value}
+
+class Donation(Record):
+    __slots__ = ("id", "receiver_id", "amount", "date", "message")
+
+    def __init__(self, id, receiver_id, amount=0.0, date="", message=""):
+        self.id = id
+        self.receiver_id = receiver_id
+        self.amount = amount
+        self.date = date
+        self.message = message
+
+    @classmethod
+    def from_api(cls, d):
+        return cls(
+            d.get("DonationId") or d.get("id"),
+            d.get("ReceiverId") or d.get("receiver_id"),
+            to_float(d.get("Amount") if d.get("Amount") is not None else d.get("amount")),
+            str(d.get("Date") or d.get("date") or ""),
+            d.get("Message") or d.get("message") or "",
+        )
+
+def records_from(res, cls):
+    # Aceita a lista pura ou envelopada ({"receivers": [...]})
+    if isinstance(res, dict):
+        res = next((v for v in res.values() if isinstance(v, list)), [])
+    if not isinstance(res, list):
+        return []
+    return [cls.from_api(d) for d in res if isinstance(d, dict)]
+
+def receivers_from(res):
+    return records_from(res, Receiver)
+
+def products_from(res):
+    return records_from(res, Product)
+
+def donations_from(res):
+    return records_from(res, Donation)
+
+def receiver_id(r):
+    return r.id
+
+def product_key(p):
+    return p.id or p.name
+
+FEED_ORDERS = {
+    "name_asc": "Nome (A-Z)",
+    "name_desc": "Nome (Z-A)",
+    "value_asc": "Menor valor",
+    "value_desc": "Maior valor",
+}
+
+def fold(text):
+    # Minúsculas e sem acentos, para "saúde" casar com "saude"
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def search_tokens(*texts):
+    return set(re.findall(r"\w+", fold(" ".join(t for t in texts if t))))
+
+class FeedIndex:
+    # Índice local do feed: visões ordenadas (nome e valor) e índice de prefixos sobre nomes e descrições,
+    # atualizados item a item conforme receptores e produtos chegam, sem reconstrução completa
+    def __init__(self):
+        self.receivers = {}  # id -> registro
+        self.by_name = []  # (nome normalizado, id)
+        self.by_value = []  # (valor, id, chave do produto)
+        self.products = {}  # id -> {chave do produto: valor}
+        self.postings = {}  # token -> {id do receptor: nº de ocorrências}
+        self.vocabulary = []  # tokens ordenados, para busca por prefixo
+        self.doc_tokens = {}  # (id, chave ou None) -> tokens
+        # Só importa para o índice compartilhado da cópia sincronizada (DELTA.index), alterado por outro thread
+        self.lock = threading.RLock()
+
+    def _name_key(self, r):
+        return fold(r.name)
+
+    def _index_doc(self, rid, doc, tokens):
+        old = self.doc_tokens.pop((rid, doc), set())
+        for tok in old - tokens:
+            post = self.postings[tok]
+            post[rid] -= 1
+            if not post[rid]:
+                del post[rid]
+            if not post:
+                del self.postings[tok]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, tok)]
+        for tok in tokens - old:
+            post = self.postings.get(tok)
+            if post is None:
+                post = self.postings[tok] = {}
+                bisect.insort(self.vocabulary, tok)
+            post[rid] = post.get(rid, 0) + 1
+        if tokens:
+            self.doc_tokens[(rid, doc)] = tokens
+
+    def upsert_receiver(self, r):
+        rid = r.id
+        if rid is None:
+            return
+        old = self.receivers.get(rid)
+        if old is not None:
+            if old == r:
+                return
+            del self.by_name[bisect.bisect_left(self.by_name, (self._name_key(old), rid))]
+        self.receivers[rid] = r
+        bisect.insort(self.by_name, (self._name_key(r), rid))
+        self._index_doc(rid, None, search_tokens(r.name, r.description))
+
+    def remove_receiver(self, rid):
+        r = self.receivers.pop(rid, None)
+        if r is None:
+            return
+        del self.by_name[bisect.bisect_left(self.by_name, (self._name_key(r), rid))]
+        self.set_products(rid, [])
+        self._index_doc(rid, None, set())
+
+    def replace_receivers(self, receivers):
+        # Aplica uma lista nova do servidor como diferença: entra o que é novo, sai o que sumiu
+        seen = set()
+        for r in receivers:
+            seen.add(r.id)
+            self.upsert_receiver(r)
+        self.retain(seen)
+
+    def retain(self, ids):
+        for rid in [rid for rid in self.receivers if rid not in ids]:
+            self.remove_receiver(rid)
+
+    def set_products(self, rid, prods):
+        old = self.products.pop(rid, {})
+        new = {}
+        for p in prods or []:
+            key = str(product_key(p))
+            new[key] = p.value
+            self._index_doc(rid, key, search_tokens(p.name, p.description))
+        for key, value in old.items():
+            del self.by_value[bisect.bisect_left(self.by_value, (value, rid, key))]
+            if key not in new:
+                self._index_doc(rid, key, set())
+        for key, value in new.items():
+            bisect.insort(self.by_value, (value, rid, key))
+        if new:
+            self.products[rid] = new
+
+    def match(self, text):
+        # Cada termo é um prefixo; o receptor precisa casar com todos os termos
+        result = None
+        for term in search_tokens(text):
+            hits = set()
+            i = bisect.bisect_left(self.vocabulary, term)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+                hits.update(self.postings[self.vocabulary[i]])
+                i += 1
+            result = hits if result is None else result & hits
+            if not result:
+                return set()
+        return result
+
+    def query(self, text="", order="name_asc"):
+        with self.lock:
+            return self._query(text, order)
+
+    def _query(self, text, order):
+        matches = self.match(text) if text and text.strip() else None
+        if order in ("value_asc", "value_desc"):
+            # Receptores ordenados pela cota mais barata (ou mais cara); quem ainda não tem produtos carregados vai ao fim
+            ordered = self.by_value if order == "value_asc" else reversed(self.by_value)
+            ids = list(dict.fromkeys(rid for _, rid, _ in ordered if rid in self.receivers))
+            placed = set(ids)
+            ids += [rid for _, rid in self.by_name if rid not in placed]
+        else:
+            ids = [rid for _, rid in self.by_name]
+            if order == "name_desc":
+                ids.reverse()
+        return [self.receivers[rid] for rid in ids if matches is None or rid in matches]
+
+def role_from_token(token):
+    # Tokens JWT podem trazer o perfil nas claims; o payload é lido sem validar a assinatura (quem valida é o servidor)
+    parts = (token or "").split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(claims, dict):
+        return None
+    role = str(claims.get("role") or "").lower()
+    if role in ("receptor", "receiver") or claims.get("IsReceiver") is True:
+        return "receptor"
+    if role in ("doador", "donor") or claims.get("IsReceiver") is False:
+        return "doador"
+    return None
+
+class DeltaSync:
+    # Cópia local de receptores e produtos mantida por /donator/sync?since=<token>: depois da primeira carga só
+    # trafegam as mudanças. Token recusado (410) força uma ressincronização completa; 404 desliga o modo.
+    # O feed é o mesmo para todos os doadores, então há uma cópia por processo (DELTA), com um único índice de
+    # busca e ordenação, e não uma por sessão
+    PATH = "/donator/sync"
+
+    def __init__(self, scope=""):
+        self.scope = scope
+        self.lock = threading.Lock()
+        self.token = None
+        self.receivers = {}  # id -> Receiver
+        self.products = {}  # id do produto -> id do receptor
+        self.by_receiver = {}  # id do receptor -> {id do produto: Product}
+        self.index = FeedIndex()
+        self.supported = True
+        self.synced = False
+        self.loaded = False
+        self.sync_lock = threading.Lock()
+        self.syncs = 0
+        self.last = None
+
+    def _merge(self, delta):
+        # Retorna (receptores novos/alterados, ids removidos, receptores cujos produtos mudaram)
+        full = bool(delta.get("full"))
+        rec = delta.get("receivers") or {}
+        prod = delta.get("products") or {}
+        upserts = [r for r in receivers_from(rec.get("upserts")) if r.id is not None]
+        deletes = set(rec.get("deletes") or [])
+        touched = set()
+        with self.lock:
+            if full:
+                deletes |= set(self.receivers) - {r.id for r in upserts}
+                touched |= set(self.by_receiver)
+                self.products.clear()
+                self.by_receiver.clear()
+            changed = [r for r in upserts if self.receivers.get(r.id) != r]
+            for r in changed:
+                self.receivers[r.id] = r
+            for rid in deletes:
+                self.receivers.pop(rid, None)
+                for pid in self.by_receiver.pop(rid, {}):
+                    self.products.pop(pid, None)
+                touched.add(rid)
+            for pid in prod.get("deletes") or []:
+                rid = self.products.pop(pid, None)
+                if rid is not None:
+                    self.by_receiver.get(rid, {}).pop(pid, None)
+                    touched.add(rid)
+            for d in prod.get("upserts") or []:
+                p = Product.from_api(d)
+                rid = d.get("ReceiverId")
+                old = self.products.get(p.id)
+                if old is not None and old != rid:
+                    self.by_receiver.get(old, {}).pop(p.id, None)
+                    touched.add(old)
+                self.products[p.id] = rid
+                self.by_receiver.setdefault(rid, {})[p.id] = p
+                touched.add(rid)
+            self.token = delta.get("token") or self.token
+            with self.index.lock:
+                for r in changed:
+                    self.index.upsert_receiver(r)
+                for rid in deletes:
+                    self.index.remove_receiver(rid)
+                for rid in touched:
+                    if rid in self.receivers:
+                        self.index.set_products(rid, list(self.by_receiver.get(rid, {}).values()))
+        return changed, deletes, touched
+
+    def products_of(self, rid):
+        with self.lock:
+            return list(self.by_receiver.get(rid, {}).values())
+
+    def load(self):
+        with self.sync_lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            data = DISK_STORE.get(self.scope, self.PATH)
+            if isinstance(data, dict) and data.get("token"):
+                self._merge(dict(data, full=True))
+
+    def save(self):
+        with self.lock:
+            snapshot = {
+                "token": self.token,
+                "receivers": {"upserts": [r.to_api() for r in self.receivers.values()]},
+                "products": {"upserts": [
+                    dict(p.to_api(), ReceiverId=rid) for rid, prods in self.by_receiver.items() for p in prods.values()
+                ]},
+            }
+        DISK_STORE.put(self.scope, self.PATH, snapshot)
+
+    def sync(self):
+        # Serializado e compartilhado: quem esperou o lock enquanto outra sessão (ou o aquecimento) sincronizava
+        # usa o resultado dela em vez de repetir a requisição. Com mudanças, a cópia é gravada em disco aqui mesmo
+        seen = self.syncs
+        with self.sync_lock:
+            if self.syncs != seen:
+                return self.last
+            status, body = api_sync(self.token)
+            if status == 410:
+                status, body = api_sync(None)
+            if status == 404:
+                self.supported = False
+            if status != 200 or not isinstance(body, dict):
+                changes = None
+            else:
+                changes = self._merge(body)
+                self.synced = True
+                if any(changes):
+                    self.save()
+            self.syncs += 1
+            self.last = changes
+            return changes
+
+DELTA = DeltaSync()
+
+class DonationHistory:
+    # Histórico de doações carregado página a página (cursor). Os totais (geral, por receptor e por mês) são
+    # somados conforme cada página chega, e as páginas ficam guardadas para a tela reabrir sem esperar a rede
+    def __init__(self, scope):
+        self.scope = scope
+        self.lock = threading.Lock()
+        self.pages = []
+        self.next_cursor = None
+        self.done = False
+        self.seen = set()
+        self.total = 0.0
+        self.count = 0
+        self.by_receiver = {}  # id do receptor -> [total, quantidade]
+        self.by_month = {}  # "AAAA-MM" -> [total, quantidade]
+
+    def donations(self):
+        with self.lock:
+            return [d for page in self.pages for d in page]
+
+    def add_page(self, donations, next_cursor):
+        with self.lock:
+            fresh = []
+            for d in donations:
+                key = d.id or (d.receiver_id, d.date, d.amount)
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+                fresh.append(d)
+                self.total += d.amount
+                self.count += 1
+                per_receiver = self.by_receiver.setdefault(d.receiver_id, [0.0, 0])
+                per_receiver[0] += d.amount
+                per_receiver[1] += 1
+                month = d.date[:7] if re.match(r"\d{4}-\d{2}", d.date) else "—"
+                per_month = self.by_month.setdefault(month, [0.0, 0])
+                per_month[0] += d.amount
+                per_month[1] += 1
+            self.pages.append(fresh)
+            self.next_cursor = next_cursor
+            self.done = not next_cursor
+            return fresh
+
+    def load_next(self):
+        # Retorna as doações novas da página, [] no fim, ou None se a página não pôde ser carregada
+        if self.done:
+            return []
+        res = api_list_donations_page(self.next_cursor)
+        if res is None:
+            return None
+        if isinstance(res, dict) and "items" in res:
+            return self.add_page(donations_from(res["items"]), res.get("next_cursor"))
+        # Servidor sem paginação: a lista inteira vem numa página só
+        return self.add_page(donations_from(res), None)
+
+class Favorites:
+    # Receptores favoritos num conjunto local: consultar e alternar não esperam a rede. As alterações são enviadas
+    # depois, em segundo plano; vários cliques no mesmo receptor viram no máximo uma requisição (só o estado final vale)
+    def __init__(self, scope):
+        self.scope = scope
+        self.lock = threading.Lock()
+        self.ids = set()  # visão local, já com as alterações ainda não enviadas
+        self.server = {}  # id do receptor -> FavoriteId confirmado pelo servidor
+        self.dirty = set()  # receptores alterados desde o último envio
+        self.scheduled = False
+        self.loaded = False
+
+    def __contains__(self, rid):
+        return rid in self.ids
+
+    def load(self):
+        res = api_list_favorites()
+        if not isinstance(res, list):
+            return False
+        server = {}
+        for d in res:
+            if isinstance(d, dict) and d.get("CauseId") is not None:
+                server[d["CauseId"]] = d.get("FavoriteId")
+        with self.lock:
+            self.server = server
+            # O que o usuário alternou enquanto a lista estava a caminho prevalece sobre o servidor
+            self.ids = {rid for rid in server if rid not in self.dirty} | {rid for rid in self.ids if rid in self.dirty}
+            self.loaded = True
+        return True
+
+    def ordered(self, items, key=receiver_id):
+        # Favoritos primeiro, mantendo a ordem relativa de cada grupo
+        return [i for i in items if key(i) in self.ids] + [i for i in items if key(i) not in self.ids]
+
+    def toggle(self, rid):
+        # Retorna (favoritado agora, é preciso agendar um envio)
+        with self.lock:
+            if rid in self.ids:
+                self.ids.discard(rid)
+            else:
+                self.ids.add(rid)
+            self.dirty.add(rid)
+            schedule = not self.scheduled
+            self.scheduled = True
+            return rid in self.ids, schedule
+
+    def flush(self):
+        # Envia só a diferença entre o estado local e o confirmado; retorna quantas alterações falharam
+        with self.lock:
+            self.scheduled = False
+            changes = [(rid, rid in self.ids, self.server.get(rid)) for rid in self.dirty]
+            self.dirty.clear()
+        failed = []
+        for rid, wanted, fav_id in changes:
+            if wanted and fav_id is None:
+                res = api_favorite_cause(rid)
+                ok = isinstance(res, dict) and not res.get("error")
+                if ok:
+                    # Sem FavoriteId na resposta, a remoção usa o próprio id do receptor
+                    fav_id = res.get("FavoriteId") or rid
+            elif not wanted and fav_id is not None:
+                ok = api_remove_favorite(fav_id) is not None
+                if ok:
+                    fav_id = None
+            else:
+                continue
+            with self.lock:
+                if not ok:
+                    failed.append(rid)
+                    self.dirty.add(rid)
+                elif fav_id is None:
+                    self.server.pop(rid, None)
+                else:
+                    self.server[rid] = fav_id
+        return len(failed)
+
+_api_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+
+async def run_api(fn, *args, session=None):
+    # Executa uma chamada api_* bloqueante fora do loop de eventos, reaproveitando o pool HTTP compartilhado.
+    # O contexto é copiado para o thread, então a sessão ativa (ou a informada) segue junto
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    if session is not None:
+        ctx.run(_session.set, session)
+    return await loop.run_in_executor(_api_executor, ctx.run, fn, *args)
+
+async def fetch_cause_products_many(receiver_ids, session=None, limit=FEED_CONCURRENCY):
+    # Busca os produtos de vários receptores em paralelo, devolvendo (id, produtos, erro) na ordem de entrada.
+    # O leque é aberto no loop sobre o pool de API compartilhado: com N sessões não surgem N pools de threads
+    gate = asyncio.Semaphore(max(1, limit))
+
+    async def fetch(rid):
+        async with gate:
+            try:
+                prods = await run_api(api_get_cause_products, rid, session=session)
+            except Exception as exc:
+                return rid, None, str(exc) or exc.__class__.__name__
+        if prods is None:
+            return rid, None, "Falha ao carregar produtos."
+        return rid, prods, None
+
+    return list(await asyncio.gather(*(fetch(rid) for rid in receiver_ids)))
+
+async def run_api_stream(gen_fn, *args, batch_size=FEED_PAGE_SIZE, session=None):
+    # Consome um gerador bloqueante (ex.: api_stream) num thread do pool e entrega os itens ao loop em lotes.
+    # A fila é limitada: se a tela não acompanha, o download espera em vez de acumular memória
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_BATCHES)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Devolve False se quem consome desistiu (ex.: o usuário trocou de tela)
+        fut = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not stop.is_set():
+            try:
+                fut.result(timeout=0.1)
+                return True
+            except FuturesTimeout:
+                continue
+        fut.cancel()
+        return False
+
+    def pump():
+        gen = gen_fn(*args)
+        size = batch_size
+        try:
+            batch = []
+            for item in gen:
+                batch.append(item)
+                if len(batch) >= size:
+                    if not put(batch):
+                        return
+                    # O primeiro lote é pequeno para a tela aparecer logo; os seguintes crescem para reduzir o vaivém entre threads
+                    batch = []
+                    size = min(size * 2, STREAM_MAX_BATCH)
+            if batch and not put(batch):
+                return
+            put(done)
+        except Exception as exc:
+            put(exc)
+        finally:
+            gen.close()
+
+    ctx = contextvars.copy_context()
+    if session is not None:
+        ctx.run(_session.set, session)
+    loop.run_in_executor(_api_executor, ctx.run, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def is_transient_failure(res):
+    # Sem resposta, erro do servidor ou limite de taxa: vale tentar de novo mais tarde. 401 não entra: o mesmo
+    # token continuaria recusado em todo reenvio (ver is_auth_failure)
+    if res is None:
+        return True
+    error = res.get("error") if isinstance(res, dict) else None
+    return isinstance(error, int) and (error >= 500 or error in (408, 429))
+
+def is_auth_failure(res):
+    # Token vencido ou revogado: a doação continua válida e só precisa de um novo login
+    return isinstance(res, dict) and res.get("error") == 401
+
+class DonationJournal:
+    # Diário append-only (uma linha JSON por registro, com fsync) das doações que não chegaram ao servidor.
+    # Cada doação leva uma chave de idempotência; um thread em segundo plano reenvia em lotes e grava os "done"
+    def __init__(self, path=DONATION_JOURNAL_PATH, batch_size=DONATION_BATCH_SIZE, retry_seconds=DONATION_RETRY_SECONDS):
+        self.path = path
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.entries = OrderedDict()  # chave -> (escopo, payload)
+        # ApiSession logada -> (escopo, referência fraca à função avisada após um envio). Chaveado pela sessão:
+        # duas abas com a mesma conta não se sobrepõem, e o aviso não mantém viva a página de uma aba fechada
+        self.sessions = {}
+        self.thread = None
+        self.file = None
+        # Lido e compactado no primeiro uso (ou no pré-aquecimento): o fsync da compactação não atrasa a abertura
+        self.loaded = not path
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self._load()
+                    self.loaded = True
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # linha truncada por uma queda no meio da escrita
+                    if record.get("op") == "add":
+                        self.entries[record["key"]] = (record.get("scope"), record.get("payload"))
+                    elif record.get("op") == "done":
+                        self.entries.pop(record.get("key"), None)
+        except OSError:
+            pass
+        try:
+            self._rewrite()
+        except OSError:
+            self.path = None
+
+    def _rewrite(self):
+        # Compacta o diário mantendo só o que ainda está pendente
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, (scope, payload) in self.entries.items():
+                f.write(json.dumps({"op": "add", "key": key, "scope": scope, "payload": payload}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if self.file:
+            self.file.close()
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def _append(self, records):
+        if self.file is None:
+            return
+        self.file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def append(self, key, scope, payload):
+        self.ensure_loaded()
+        with self.lock:
+            self._append([{"op": "add", "key": key, "scope": scope, "payload": payload, "ts": time.time()}])
+            self.entries[key] = (scope, payload)
+        self.kick()
+
+    def pending(self, scope=None):
+        self.ensure_loaded()
+        with self.lock:
+            return [(k, p) for k, (s, p) in self.entries.items() if scope is None or s == scope]
+
+    def _ack(self, keys):
+        with self.lock:
+            self._append([{"op": "done", "key": k, "ts": time.time()} for k in keys])
+            for k in keys:
+                self.entries.pop(k, None)
+            if not self.entries and self.file is not None:
+                try:
+                    self._rewrite()
+                except OSError:
+                    pass
+
+    def activate(self, scope, session, listener=None):
+        # Só as doações de usuários logados podem ser enviadas, cada uma com o token da própria sessão
+        if listener is None:
+            ref = None
+        elif hasattr(listener, "__self__"):
+            ref = weakref.WeakMethod(listener)
+        else:
+            ref = weakref.ref(listener)
+        with self.lock:
+            self.sessions.pop(session, None)  # reentra no fim: a sessão mais recente do escopo é a usada
+            self.sessions[session] = (scope, ref)
+        self.kick()
+
+    def deactivate(self, session):
+        # Logout ou aba fechada: as doações do escopo continuam no diário para a próxima sessão
+        with self.lock:
+            self.sessions.pop(session, None)
+
+    def kick(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="donation-journal", daemon=True)
+            self.thread.start()
+        self.wake.set()
+
+    def should_queue(self, scope):
+        # Com o circuito aberto grava direto no diário sem esperar a rede. Doações ainda na fila não impedem
+        # o envio: se o servidor responder, o diário é acordado para reenviá-las logo em seguida
+        self.ensure_loaded()
+        return breaker_for().stats()["state"] == "open"
+
+    def _session_for(self, scope):
+        # A sessão mais recente do escopo cuja página ainda existe; as de páginas já coletadas são descartadas
+        with self.lock:
+            for session, (s, ref) in reversed(list(self.sessions.items())):
+                if s != scope:
+                    continue
+                if ref is not None and ref() is None:
+                    del self.sessions[session]
+                    continue
+                return session, ref
+        return None
+
+    def _scopes(self):
+        with self.lock:
+            return {scope for scope, _ in self.sessions.values()}
+
+    def _run(self):
+        while True:
+            waiting = any(self.pending(scope) for scope in self._scopes())
+            self.wake.wait(self.retry_seconds if waiting else None)
+            self.wake.clear()
+            for scope in self._scopes():
+                self.flush(scope)
+
+    def flush(self, scope):
+        active = self._session_for(scope)
+        if active is None:
+            return 0, 0
+        session, ref = active
+        sent = rejected = 0
+        expired = False
+        with self.flush_lock:
+            while True:
+                batch = self.pending(scope)[: self.batch_size]
+                if not batch:
+                    break
+                done, stalled = [], False
+                for key, payload in batch:
+                    res = session.run(api_add_donation, payload, key)
+                    if is_auth_failure(res):
+                        expired = stalled = True
+                        break
+                    if is_transient_failure(res):
+                        stalled = True
+                        break
+                    done.append(key)
+                    if isinstance(res, dict) and res.get("error") and res.get("error") != "conflict":
+                        rejected += 1
+                    else:
+                        sent += 1
+                if done:
+                    self._ack(done)
+                if stalled or session not in self.sessions:
+                    break
+        if expired:
+            # 401 no reenvio: só esta sessão sai; nada é descartado e o próximo login (ou outra aba) reenvia
+            self.deactivate(session)
+            self.wake.set()
+        listener = ref() if ref is not None else None
+        if (sent or rejected or expired) and listener:
+            listener(sent, rejected, expired)
+        return sent, rejected
+
+DONATION_JOURNAL = DonationJournal(DONATION_JOURNAL_PATH if os.environ.get("DONATION_JOURNAL", "1") == "1" else None)
+
+class UpdateScheduler:
+    # Junta os pedidos de page.update() feitos dentro de um quadro em um único envio ao cliente
+    def __init__(self, schedule, send, frame_ms=UPDATE_FRAME_MS):
+        self.schedule = schedule
+        self.send = send
+        self.frame = frame_ms / 1000
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.requested = 0
+        self.sent = 0
+
+    def request(self):
+        with self.lock:
+            self.requested += 1
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.schedule(self._flush_later)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.frame)
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            # Liberado antes do envio: pedidos feitos durante o update entram no próximo quadro
+            self.scheduled = False
+            self.sent += 1
+        self.send()
+
+    def stats(self):
+        with self.lock:
+            return {"requested": self.requested, "sent": self.sent, "coalesced": self.requested - self.sent}
+
+STARTUP = OrderedDict()  # fase -> ms desde o início do import de main
+
+def mark_startup(phase):
+    # Só a primeira marcação de cada fase vale: no modo web, a da primeira sessão do processo
+    if phase not in STARTUP:
+        STARTUP[phase] = round((time.perf_counter() - _STARTED) * 1000, 1)
+        if STARTUP_REPORT:
+            print(f"Inicialização: {phase} em {STARTUP[phase]} ms")
+
+@functools.lru_cache(maxsize=None)
+def asset_exists(path):
+    # Verificado uma vez por processo, não a cada sessão aberta
+    return os.path.exists(path)
+
+def _pillow_available():
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+_backgrounds = {}  # (largura, altura) -> caminho da imagem de fundo a usar
+_backgrounds_lock = threading.Lock()
+
+def background_image(width, height):
+    # Fundo já reduzido ao tamanho da janela, vindo do cache em disco. Sem ele (ou sem o tamanho, ainda
+    # desconhecido antes do primeiro on_resized) usa o original e, com Pillow, gera a versão reduzida em
+    # segundo plano para o próximo redimensionamento ou abertura
+    if not asset_exists(BG_IMAGE):
+        return None
+    if not width or not height:
+        return BG_IMAGE
+    size = (-(-int(width) // BG_SIZE_STEP) * BG_SIZE_STEP, -(-int(height) // BG_SIZE_STEP) * BG_SIZE_STEP)
+    with _backgrounds_lock:
+        if size in _backgrounds:
+            return _backgrounds[size]
+        st = os.stat(BG_IMAGE)
+        base = os.path.join(BG_CACHE_DIR, f"01-{size[0]}x{size[1]}-{int(st.st_mtime)}-{st.st_size}")
+        cached = next((base + ext for ext in (".jpg", ".png") if os.path.exists(base + ext)), None)
+        _backgrounds[size] = cached or BG_IMAGE
+    if cached is None and _pillow_available():
+        threading.Thread(target=_prescale_background, args=(base, size), name="bg-prescale", daemon=True).start()
+    return cached or BG_IMAGE
+
+def _prescale_background(base, size):
+    from PIL import Image
+    try:
+        with Image.open(BG_IMAGE) as im:
+            # Nunca amplia: numa janela maior que a imagem o original já é a melhor versão
+            target = (min(size[0], im.width), min(size[1], im.height))
+            if target == im.size:
+                return
+            # Sem transparência real o fundo vira JPEG, bem menor que o PNG original
+            opaque = im.mode not in ("RGBA", "LA", "P") or im.convert("RGBA").getchannel("A").getextrema() == (255, 255)
+            scaled = im.convert("RGB" if opaque else "RGBA").resize(target, Image.LANCZOS)
+        os.makedirs(BG_CACHE_DIR, exist_ok=True)
+        path = base + (".jpg" if opaque else ".png")
+        scaled.save(path + ".tmp", format="JPEG" if opaque else "PNG", quality=85, optimize=True)
+        os.replace(path + ".tmp", path)
+    except (OSError, ValueError):
+        return
+    with _backgrounds_lock:
+        _backgrounds[size] = path
+
+_prewarm_lock = threading.Lock()
+_prewarm_started = False
+
+def start_prewarm():
+    # Depois do primeiro quadro: cria o cliente HTTP (contexto SSL e pool) e abre o cache em disco e o diário
+    # enquanto o usuário digita o login
+    global _prewarm_started
+    with _prewarm_lock:
+        if _prewarm_started:
+            return
+        _prewarm_started = True
+
+    def prewarm():
+        http_client()
+        DISK_STORE.connection()
+        DONATION_JOURNAL.ensure_loaded()
+        mark_startup("prewarmed")
+
+    threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+
 class DonationApp:
     PRIMARY = "#8A2BE2"
     ACCENT = "#BA55D3"
@@ -156,13 +2234,25 @@ class DonationApp:
         page.padding = 0
         page.assets_dir = "assets"
         page.fonts = {
-            "Poppins": "assets/fonts/Poppins-Regular.ttf" if os.path.exists("assets/fonts/Poppins-Regular.ttf") else None,
-            "PoppinsBold": "assets/fonts/Poppins-Bold.ttf" if os.path.exists("assets/fonts/Poppins-Bold.ttf") else None
+            "Poppins": FONT_REGULAR if asset_exists(FONT_REGULAR) else None,
+            "PoppinsBold": FONT_BOLD if asset_exists(FONT_BOLD) else None
         }
         page.theme = ft.Theme(font_family="Poppins")
 
         self.current_user = None
-        self.access_token = None
+        self.session = ApiSession()
+        self.view_seq = 0
+        self.pending = set()
+        self.updates = UpdateScheduler(self.spawn, self.page.update)
+        self.feed_index = FeedIndex()
+        self.delta = None
+        self.history = None
+        self.favorites = None
+        self.favorite_buttons = {}
+        self.file_picker = None
+        self.feed_lock = threading.RLock()
+        self.feed_search = ""
+        self.feed_order = "name_asc"
 
         self.container = ft.Column(alignment=ft.MainAxisAlignment.CENTER,
                                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
@@ -178,14 +2268,23 @@ class DonationApp:
             spacing=0, expand=True
         )
 
-        bg_image_path = "assets/01.png" if os.path.exists("assets/01.png") else None
+        bg_image_path = background_image(page.width or page.window.width, page.height or page.window.height)
         stack_children = []
+        self.background = None
         if bg_image_path:
-            stack_children.append(ft.Container(expand=True, content=ft.Image(src=bg_image_path, fit=ft.ImageFit.FILL, expand=True)))
+            self.background = ft.Image(src=bg_image_path, fit=ft.ImageFit.FILL, expand=True)
+            stack_children.append(ft.Container(expand=True, content=self.background))
         stack_children.append(self.main_column)
+        page.on_resized = self.on_resized
+        page.on_connect = self.on_connect
+        page.on_disconnect = self.on_disconnect
+        page.on_close = self.on_close
 
-        self.page.add(ft.Stack(stack_children, expand=True))
+        # O card de login já está no container quando o layout é enviado: o primeiro quadro sai completo
         self.show_login()
+        self.page.add(ft.Stack(stack_children, expand=True))
+        mark_startup("first_frame")
+        start_prewarm()
 
     def build_header(self):
         if self.current_user:
@@ -195,6 +2294,8 @@ class DonationApp:
                     ft.Container(expand=True),
                     ft.Text(f"Logado: {self.current_user.get('name','') or self.current_user.get('email','') } ({self.current_user.get('role','')})", color="white", size=14),
                     ft.Container(width=10),
+                    *self.debug_controls(),
+                    *self.nav_controls(),
                     ft.ElevatedButton("Sair", on_click=self.logout, style=ft.ButtonStyle(bgcolor=self.PRIMARY, color="white"))
                 ], alignment=ft.MainAxisAlignment.START),
                 bgcolor=self.CARD_BG, padding=ft.padding.symmetric(horizontal=20), height=70, expand=True,
@@ -202,28 +2303,156 @@ class DonationApp:
             )
         else:
             return ft.Container(
-                content=ft.Row([ft.Text("Sistema de Doações", size=28, color="white", font_family="PoppinsBold")]),
+                content=ft.Row([ft.Text("Sistema de Doações", size=28, color="white", font_family="PoppinsBold"), ft.Container(expand=True), *self.debug_controls()]),
                 bgcolor=self.CARD_BG, padding=ft.padding.symmetric(horizontal=20), height=70, expand=True,
                 alignment=ft.alignment.center_left
             )
 
+    def nav_controls(self):
+        if (self.current_user or {}).get("role") != "doador":
+            return []
+        return [
+            ft.TextButton("Causas", on_click=lambda e: self.show_donor_feed(), style=ft.ButtonStyle(color=self.ACCENT)),
+            ft.TextButton("Minhas doações", on_click=lambda e: self.show_donation_history(), style=ft.ButtonStyle(color=self.ACCENT)),
+            ft.Container(width=10),
+        ]
+
+    def debug_controls(self):
+        if not APP_DEBUG:
+            return []
+        return [
+            ft.TextButton("Métricas", on_click=self.show_metrics_panel, style=ft.ButtonStyle(color=self.ACCENT)),
+            ft.Container(width=10),
+        ]
+
+    def metrics_tables(self):
+        snap = METRICS.snapshot()
+
+        def cell(value):
+            return ft.DataCell(ft.Text(str(value), color=self.TEXT, size=12))
+
+        def header(*names):
+            return [ft.DataColumn(ft.Text(n, color=self.ACCENT, size=12)) for n in names]
+
+        endpoints = ft.DataTable(
+            columns=header("Endpoint", "n", "p50 ms", "p95 ms", "p99 ms", "status", "timeouts", "erros", "KB rec."),
+            rows=[
+                ft.DataRow([
+                    cell(label), cell(ep["count"]), cell(ep["p50_ms"]), cell(ep["p95_ms"]), cell(ep["p99_ms"]),
+                    cell(" ".join(f"{k}:{v}" for k, v in ep["status"].items())), cell(ep["timeouts"]), cell(ep["errors"]),
+                    cell(round(ep["bytes_received"] / 1024, 1)),
+                ])
+                for label, ep in snap["endpoints"].items()
+            ],
+        )
+        views = ft.DataTable(
+            columns=header("Tela", "n", "p50 ms", "p95 ms", "p99 ms"),
+            rows=[
+                ft.DataRow([cell(name), cell(v["count"]), cell(v["p50_ms"]), cell(v["p95_ms"]), cell(v["p99_ms"])])
+                for name, v in snap["views"].items()
+            ],
+        )
+        pool, cache = snap["pool"], snap["cache"]
+        return [
+            endpoints,
+            views,
+            ft.Text(f"Pool HTTP: {pool['requests']} req., {pool['reused_connections']} reaproveitadas, {pool['new_connections']} novas", color=self.TEXT),
+            ft.Text(f"Cache GET: {cache['hits']} hits, {cache['misses']} misses, {cache['size']} entradas", color=self.TEXT),
+            ft.Text("Inicialização: " + ", ".join(f"{phase} {ms} ms" for phase, ms in snap["startup"].items()), color=self.TEXT),
+        ]
+
+    def show_metrics_panel(self, e=None):
+        body = ft.Column(self.metrics_tables(), scroll=ft.ScrollMode.AUTO, width=900, height=500)
+
+        def refresh(ev):
+            body.controls = self.metrics_tables()
+            self.update()
+
+        dialog = ft.AlertDialog(
+            title=ft.Text("Métricas", color=self.TEXT),
+            bgcolor=self.CARD_BG,
+            content=body,
+            actions=[
+                ft.TextButton("Atualizar", on_click=refresh, style=ft.ButtonStyle(color=self.ACCENT)),
+                ft.TextButton("Fechar", on_click=lambda ev: self.page.close(dialog), style=ft.ButtonStyle(color=self.ACCENT)),
+            ],
+        )
+        self.page.open(dialog)
+
     def refresh_header(self):
         try:
             self.main_column.controls[0] = self.build_header()
-            self.page.update()
+            self.update()
         except Exception:
             pass
 
     def clear(self):
+        self.view_seq += 1
         self.container.controls.clear()
 
+    def on_resized(self, e):
+        # Troca o fundo pela versão do novo tamanho assim que ela existir; até lá fica o original, nunca uma ampliada
+        if self.background is None:
+            return
+        src = background_image(e.width, e.height)
+        if src and src != self.background.src:
+            self.background.src = src
+            self.update()
+
+    async def api(self, fn, *args):
+        # run_api com a sessão deste usuário: o token não se mistura com o de outras abas no modo web
+        return await run_api(fn, *args, session=self.session)
+
+    def spawn(self, handler, *args):
+        # Agenda uma corrotina no loop do Flet e acompanha as tarefas ainda em andamento
+        fut = self.page.run_task(handler, *args)
+        self.pending.add(fut)
+        fut.add_done_callback(self.pending.discard)
+        return fut
+
+    def on_connect(self, e=None):
+        # Aba reconectada: volta a reenviar as doações pendentes deste usuário
+        if self.current_user:
+            DONATION_JOURNAL.activate(self.current_user["email"], self.session, self.on_journal_flushed)
+
+    def on_disconnect(self, e=None):
+        DONATION_JOURNAL.deactivate(self.session)
+
+    def on_close(self, e=None):
+        # Sessão web encerrada: nada do processo pode continuar apontando para esta página
+        DONATION_JOURNAL.deactivate(self.session)
+        if self.session.token:
+            RESPONSE_CACHE.clear(self.session.token)  # sem token, clear() apagaria o cache de todos
+        self.view_seq += 1
+
+    def on_journal_flushed(self, sent, rejected, expired=False):
+        # Chamado pelo thread do diário de doações; a mensagem é exibida no loop do Flet
+        self.spawn(self.notify_journal_flushed, sent, rejected, expired)
+
+    async def notify_journal_flushed(self, sent, rejected, expired=False):
+        self.history = None
+        if expired:
+            self.snackbar("Sessão expirada: as doações pendentes serão enviadas quando você entrar novamente.")
+        elif rejected:
+            self.snackbar(f"{sent} doação(ões) pendente(s) enviada(s), {rejected} recusada(s) pelo servidor.")
+        else:
+            self.snackbar(f"{sent} doação(ões) pendente(s) enviada(s).")
+
+    def loading(self, msg="Carregando..."):
+        return ft.Row(
+            [ft.ProgressRing(width=18, height=18, stroke_width=2, color=self.ACCENT), ft.Text(msg, color=self.TEXT)],
+            alignment=ft.MainAxisAlignment.CENTER,
+        )
+
     def update(self):
-        self.page.update()
+        self.updates.request()
 
     def snackbar(self, msg):
         self.page.snack_bar = ft.SnackBar(ft.Text(msg), open=True, bgcolor=self.CARD_BG)
-        self.page.update()
+        self.update()
 
+    @profiled
+    @timed_view
     def show_login(self, e=None):
         self.clear()
 
@@ -231,9 +2460,16 @@ class DonationApp:
         password = ft.TextField(label="Senha", width=350, password=True, can_reveal_password=True, color=self.TEXT, border_color=self.PRIMARY, focused_border_color=self.ACCENT)
 
     
-        def do_login(ev):
-            global ACCESS_TOKEN
-            res = api_login(email.value.strip(), password.value)
+        @profiled
+        async def do_login(ev):
+            login_btn.disabled = True
+            login_btn.text = "Entrando..."
+            self.update()
+            try:
+                res = await self.api(api_login, email.value.strip(), password.value)
+            finally:
+                login_btn.disabled = False
+                login_btn.text = "Entrar"
 
             if res is None:
                 error_msg.value = "Falha ao comunicar com o servidor."
@@ -250,9 +2486,9 @@ class DonationApp:
             error_msg.visible = False         
 
             if "access_token" in res:
-                ACCESS_TOKEN = res.get("access_token")
+                self.session.token = res.get("access_token")
 
-                role = self.detect_role()
+                role = await self.detect_role()
 
                 if role is None:
                      return 
@@ -262,6 +2498,8 @@ class DonationApp:
                     "name": res.get("user"),
                     "role": role
                 }
+                DONATION_JOURNAL.activate(self.current_user["email"], self.session, self.on_journal_flushed)
+                self.spawn(self.warm_up, role)
 
                 self.refresh_header()
                 self.snackbar(f"Bem-vindo(a), {self.current_user.get('name')}")
@@ -294,6 +2532,8 @@ class DonationApp:
         self.container.controls.append(card)
         self.update()
 
+    @profiled
+    @timed_view
     def show_register(self, e=None):
         self.clear()
 
@@ -305,17 +2545,19 @@ class DonationApp:
         password = ft.TextField(label="Senha", width=400, password=True, can_reveal_password=True, color=self.TEXT, border_color=self.PRIMARY)
         description = ft.TextField(label="Motivo/Descrição", width=400, multiline=True, color=self.TEXT, border_color=self.PRIMARY)
 
+        @profiled
         def on_role_change(e):
             vis = (role.value == "receptor")
             cpf_cnpj.visible = vis
             cep.visible = vis
             description.visible = vis
-            self.page.update()
+            self.update()
 
         role.on_change = on_role_change
         on_role_change(None)
 
-        def do_register(ev):
+        @profiled
+        async def do_register(ev):
             if not name.value.strip() or not email.value.strip() or not password.value.strip():
                 self.snackbar("Preencha nome, e-mail e senha.")
                 return
@@ -329,7 +2571,12 @@ class DonationApp:
                 "password": password.value,
                 "description": description.value.strip() if role.value == "receptor" else "",
             }
-            res = api_register_user(new_user)
+            btn_register.disabled = True
+            self.update()
+            try:
+                res = await self.api(api_register_user, new_user)
+            finally:
+                btn_register.disabled = False
             if res is None:
                 self.snackbar("Erro ao cadastrar (backend).")
                 return
@@ -350,15 +2597,41 @@ class DonationApp:
         self.container.controls.append(card)
         self.update()
 
-    def detect_role(self):
-        products = api_get("/receiver/get_products")
+    async def detect_role(self):
+        role = role_from_token(self.session.token)
+        if role is not None:
+            return role
+        # Uma única sondagem: só receptores listam os próprios produtos, e a resposta fica no cache para o dashboard
+        products = await self.api(api_get_products)
         if products is not None:
             return "receptor"
-        favs = api_get("/donator/favorites")
-        if favs is not None:
-            return "doador"
         return "doador"
 
+    @profiled
+    async def warm_up(self, role):
+        # Busca em paralelo os dados da tela inicial enquanto o cabeçalho e o esqueleto são desenhados
+        if role == "receptor":
+            await self.api(api_get_products)
+            return
+        favorites = self.favorites_state()
+        if DELTA_SYNC:
+            delta = await self.delta_sync()
+            await asyncio.gather(self.api(delta.sync), self.api(favorites.load))
+            if delta.supported:
+                return
+        receivers_res, _ = await asyncio.gather(
+            self.api(api_list_receivers, "name_asc"),
+            self.api(favorites.load),
+        )
+        # Produtos dos favoritos vêm antes dos da primeira página do feed
+        ids = list(dict.fromkeys([*favorites.ids, *(r.id for r in receivers_from(receivers_res)[:FEED_PAGE_SIZE])]))
+        results = await fetch_cause_products_many([rid for rid in ids if rid], session=self.session)
+        for rid, prods, _ in results:
+            if prods is not None:
+                self.index_products(rid, products_from(prods))
+
+    @profiled
+    @timed_view
     def show_home(self, e=None):
         self.clear()
         if not self.current_user:
@@ -374,20 +2647,29 @@ class DonationApp:
         self.refresh_header()
         self.update()
 
+    @profiled
     def logout(self, e=None):
-        global ACCESS_TOKEN
-        ACCESS_TOKEN = None
+        RESPONSE_CACHE.clear(self.session.token)
+        DONATION_JOURNAL.deactivate(self.session)
+        self.session = ApiSession()
+        self.feed_index = FeedIndex()
+        self.delta = None
+        self.history = None
+        self.favorites = None
         self.current_user = None
         self.refresh_header()
         self.show_login()
 
+    @profiled
+    @timed_view
     def show_receptor_dashboard(self):
         u = self.current_user
         self.clear()
 
         pix_tf = ft.TextField(label="Chave PIX", value="", width=400, color=self.TEXT, border_color=self.PRIMARY)
 
-        def save_pix(ev):
+        @profiled
+        async def save_pix(ev):
             val = pix_tf.value.strip()
             if not val:
                 self.snackbar("Preencha a chave PIX.")
@@ -395,7 +2677,7 @@ class DonationApp:
                 print("DEBUG: Enviando pix:", val)
                 res = api_add_pix(val)
                 print("DEBUG: resposta api_add_pix ->", res)
-            res = api_add_pix(val)
+            res = await self.api(api_add_pix, val)
             if res is None:
                 self.snackbar("Erro ao salvar PIX.")
             else:
@@ -413,23 +2695,44 @@ class DonationApp:
         value = ft.TextField(label="Valor (ex: 50.00)", width=400, color=self.TEXT, border_color=self.PRIMARY)
         desc = ft.TextField(label="Descrição", width=400, multiline=True, height=100, color=self.TEXT, border_color=self.PRIMARY)
 
-        def create_product(ev):
-            t = title.value.strip(); v = value.value.strip().replace(",", "."); d = desc.value.strip()
+        @profiled
+        async def create_product(ev):
+            t = title.value.strip(); v = value.value.strip(); d = desc.value.strip()
             if not t or not v:
                 self.snackbar("Preencha título e valor.")
                 return
             try:
-                v_float = float(v)
-            except:
-                self.snackbar("Valor inválido.")
+                v_float = float_format(v)
+            except ValueError as exc:
+                self.snackbar(f"Valor inválido: {exc}.")
                 return
             new_prod = {"title": t, "value": v_float, "description": d}
-            res = api_create_product(new_prod)
-            if res is None:
+
+            # Mostra o card na hora; se a API falhar ele é removido e o formulário continua preenchido
+            record = Product(f"pending-{uuid.uuid4().hex}", t, d, v_float)
+            card = self.insert_owned_card(record, pending=True)
+            self.update()
+
+            try:
+                res = await self.api(api_create_product, new_prod)
+            except Exception as exc:
+                self.remove_owned_card(card)
+                self.snackbar(f"Erro ao criar produto: {str(exc) or exc.__class__.__name__}.")
+                return
+            if res is None or (isinstance(res, dict) and res.get("error")):
+                self.remove_owned_card(card)
                 self.snackbar("Erro ao criar produto.")
+                return
+
+            title.value = value.value = desc.value = ""
+            server_id = res.get("ProductId") or res.get("id") if isinstance(res, dict) else None
+            if server_id:
+                self.insert_owned_card(Product.from_api({**record.to_api(), **res, "ProductId": server_id}), replace=card)
+                await self.remember_owned_products()
             else:
-                self.snackbar("Produto criado com sucesso.")
-                self.show_receptor_dashboard()
+                # Resposta sem id: mantém o card e reconcilia com a lista do servidor em segundo plano
+                self.spawn(self.load_receptor_products, self.owned_list, self.view_seq)
+            self.snackbar("Produto criado com sucesso.")
 
         create_card = ft.Card(ft.Container(ft.Column([
             ft.Text("Criar novo produto/cota", style="headlineMedium", color=self.TEXT),
@@ -438,36 +2741,232 @@ class DonationApp:
             ft.Row([ft.ElevatedButton("Criar", on_click=create_product, style=ft.ButtonStyle(bgcolor=self.PRIMARY, color=self.TEXT))], alignment=ft.MainAxisAlignment.CENTER)
         ], spacing=15), padding=25, bgcolor=self.CARD_BG, border_radius=15, width=550), elevation=4, margin=ft.margin.only(bottom=25))
         self.container.controls.append(create_card)
+        self.container.controls.append(self.build_import_card())
 
-        prods = api_get("/receiver/get_products")
-        list_column = ft.Column(spacing=10)
-        if prods and isinstance(prods, list):
-            for p in prods:
-                def delete_factory(prod):
-                    def delete(ev):
-                        payload = {"ProductId": prod.get("id")} if prod.get("id") else {"ProductId": prod.get("ProductId", None)}
-                        res = api_delete_product(payload)
-                        if res is None:
-                            self.snackbar("Erro ao remover produto.")
-                        else:
-                            self.snackbar("Produto removido.")
-                            self.show_receptor_dashboard()
-                    return delete
-                item = ft.Card(ft.Container(ft.Column([
-                    ft.Text(p.get("ProductName", "—"), style="titleMedium", color=self.TEXT),
-                    ft.Text(f"R$ {float(p.get('Value', p.get('value', 0))):.2f}", color=self.TEXT),
-                    ft.Text(p.get("Description", ""), color=self.TEXT),
-                    ft.Row([ft.ElevatedButton("Excluir", on_click=delete_factory(p), style=ft.ButtonStyle(bgcolor=self.ACCENT, color=self.TEXT))], alignment=ft.MainAxisAlignment.END)
-                ], spacing=8), padding=15, bgcolor=self.CARD_BG, border_radius=10), elevation=2)
-                list_column.controls.append(item)
-        else:
-            list_column.controls.append(ft.Text("Nenhum produto encontrado.", color=self.TEXT))
+        list_column = ft.Column([self.loading("Carregando produtos...")], spacing=10)
+        self.owned_list = list_column
 
         list_card = ft.Card(ft.Container(ft.Column([ft.Text("Produtos Cadastrados", style="headlineSmall", color=self.TEXT), ft.Divider(color=self.PRIMARY), list_column], spacing=15), padding=25, bgcolor=self.CARD_BG, border_radius=15, width=650), elevation=4)
         self.container.controls.append(list_card)
         self.refresh_header()
         self.update()
+        self.spawn(self.load_receptor_products, list_column, self.view_seq)
+
+    @profiled
+    @timed_view
+    async def load_receptor_products(self, list_column, seq):
+        path = "/receiver/get_products"
+        scope = self.cache_scope()
+        cached = await self.api(DISK_STORE.get, scope, path)
+        if cached is not None and seq == self.view_seq:
+            self.render_receptor_products(list_column, products_from(cached))
+
+        prods = await self.api(api_get, path)
+        if seq != self.view_seq:
+            return
+        if prods is None and cached is not None:
+            self.snackbar("Sem conexão: exibindo produtos salvos.")
+            return
+        if prods is not None:
+            await self.api(DISK_STORE.put, scope, path, prods)
+        if cached is None or prods != cached:
+            self.render_receptor_products(list_column, products_from(prods))
+
+    def build_import_card(self):
+        # Importação em lote: valida tudo localmente, envia com paralelismo limitado e recarrega a lista uma vez no fim
+        source = ft.TextField(
+            label="CSV (title;description;value) ou JSON no formato de causes do data.json",
+            width=500, multiline=True, min_lines=4, max_lines=10, color=self.TEXT, border_color=self.PRIMARY,
+        )
+        progress = ft.ProgressBar(width=500, value=0, visible=False, color=self.ACCENT)
+        status = ft.Text("", color=self.TEXT)
+        errors = ft.ListView(height=120, spacing=4, visible=False, width=500)
+
+        def error_line(line, msg):
+            return ft.Text(f"Linha {line}: {msg}", color="red", size=12)
+
+        @profiled
+        async def on_pick(e):
+            path = e.files[0].path if e.files else None
+            if not path:
+                return
+            try:
+                source.value = await self.api(read_import_file, path)
+            except (OSError, ValueError):
+                self.snackbar("Não foi possível ler o arquivo.")
+                return
+            self.update()
+
+        @profiled
+        async def bulk_import(ev):
+            rows, invalid = parse_product_rows(source.value)
+            if not rows and not invalid:
+                self.snackbar("Nada para importar.")
+                return
+            seq = self.view_seq
+            import_btn.disabled = pick_btn.disabled = True
+            errors.controls[:] = [error_line(line, msg) for line, msg in invalid]
+            errors.visible = bool(invalid)
+            progress.value = 0
+            progress.visible = True
+            total, sent, failed = len(rows), 0, []
+
+            def report():
+                parts = [f"{sent}/{total} enviados"]
+                if failed:
+                    parts.append(f"{len(failed)} com erro")
+                if invalid:
+                    parts.append(f"{len(invalid)} linha(s) inválida(s)")
+                status.value = ", ".join(parts)
+
+            report()
+            self.update()
+
+            limit = asyncio.Semaphore(BULK_IMPORT_CONCURRENCY)
+
+            async def submit(line, row):
+                # Cada linha resolve para (linha, resposta, motivo): uma exceção não interrompe as demais
+                async with limit:
+                    try:
+                        return line, await self.api(api_create_product, row), None
+                    except Exception as exc:
+                        return line, None, str(exc) or exc.__class__.__name__
+
+            try:
+                for next_done in asyncio.as_completed([submit(line, row) for line, row in rows]):
+                    line, res, reason = await next_done
+                    if reason or res is None or (isinstance(res, dict) and res.get("error")):
+                        if not reason:
+                            reason = "sem resposta do servidor" if res is None else f"erro {res.get('error')}"
+                        failed.append(line)
+                        errors.controls.append(error_line(line, reason))
+                        errors.visible = True
+                    else:
+                        sent += 1
+                    progress.value = (sent + len(failed)) / total
+                    report()
+                    self.update()
+            finally:
+                import_btn.disabled = pick_btn.disabled = False
+            if not failed and not invalid:
+                source.value = ""
+            self.snackbar(f"Importação concluída: {sent} de {total + len(invalid)} produto(s) criados.")
+            if sent and seq == self.view_seq:
+                self.spawn(self.load_receptor_products, self.owned_list, seq)
+
+        pick_btn = ft.TextButton("Selecionar arquivo", style=ft.ButtonStyle(color=self.ACCENT),
+                                 on_click=lambda e: self.import_picker(on_pick).pick_files(allowed_extensions=["csv", "json"]))
+        import_btn = ft.ElevatedButton("Importar", on_click=bulk_import, style=ft.ButtonStyle(bgcolor=self.PRIMARY, color=self.TEXT))
+        return ft.Card(ft.Container(ft.Column([
+            ft.Text("Importar produtos em lote", style="headlineSmall", color=self.TEXT),
+            ft.Divider(color=self.PRIMARY),
+            source,
+            ft.Row([import_btn, pick_btn], alignment=ft.MainAxisAlignment.CENTER),
+            progress, status, errors,
+        ], spacing=15), padding=25, bgcolor=self.CARD_BG, border_radius=15, width=550), elevation=4, margin=ft.margin.only(bottom=25))
+
+    def import_picker(self, on_result):
+        # Um único FilePicker por página: o overlay não cresce a cada visita ao dashboard
+        picker = self.file_picker
+        if picker is None:
+            picker = self.file_picker = ft.FilePicker()
+            self.page.overlay.append(picker)
+            self.page.update()
+        picker.on_result = on_result
+        return picker
+
+    def render_receptor_products(self, list_column, prods):
+        if prods:
+            if not any(isinstance(c.data, tuple) for c in list_column.controls):
+                list_column.controls.clear()
+            self.sync_cards(list_column, prods, product_key, self.build_owned_product_card)
+        else:
+            list_column.controls[:] = [ft.Text("Nenhum produto encontrado.", color=self.TEXT)]
+        self.update()
 
+    def build_owned_product_card(self, p, pending=False):
+        async def delete(ev):
+            await self.delete_owned_product(card, p)
+
+        delete_btn = ft.ElevatedButton("Excluir", on_click=delete, disabled=pending, style=ft.ButtonStyle(bgcolor=self.ACCENT, color=self.TEXT))
+        card = ft.Card(ft.Container(ft.Column([
+            ft.Text(p.name or "—", style="titleMedium", color=self.TEXT),
+            ft.Text(f"R$ {p.value:.2f}", color=self.TEXT),
+            ft.Text(p.description, color=self.TEXT),
+            ft.Row([delete_btn], alignment=ft.MainAxisAlignment.END)
+        ], spacing=8), padding=15, bgcolor=self.CARD_BG, border_radius=10), elevation=2, opacity=0.5 if pending else 1.0)
+        return card
+
+    def insert_owned_card(self, record, pending=False, replace=None, index=None):
+        controls = self.owned_list.controls
+        card = self.build_owned_product_card(record, pending=pending)
+        card.data = (product_key(record), record)
+        if replace is not None and replace in controls:
+            controls[controls.index(replace)] = card
+            return card
+        # Tira o placeholder ("Carregando..."/"Nenhum produto") antes do primeiro card
+        controls[:] = [c for c in controls if isinstance(c.data, tuple)]
+        if index is None:
+            controls.append(card)
+        else:
+            controls.insert(min(index, len(controls)), card)
+        return card
+
+    def remove_owned_card(self, card):
+        controls = self.owned_list.controls
+        index = controls.index(card) if card in controls else None
+        if index is not None:
+            controls.pop(index)
+        if not controls:
+            controls.append(ft.Text("Nenhum produto encontrado.", color=self.TEXT))
+        self.update()
+        return index
+
+    @profiled
+    async def delete_owned_product(self, card, p):
+        payload = {"ProductId": p.id}
+        index = self.remove_owned_card(card)
+        res = await self.api(api_delete_product, payload)
+        if res is None:
+            self.insert_owned_card(p, index=index)
+            self.snackbar("Erro ao remover produto.")
+            return
+        await self.remember_owned_products()
+        self.snackbar("Produto removido.")
+
+    async def remember_owned_products(self):
+        # Mantém caches em memória e em disco alinhados com a lista já exibida, sem refazer o GET
+        path = "/receiver/get_products"
+        prods = [c.data[1].to_api() for c in self.owned_list.controls
+                 if isinstance(c.data, tuple) and not str(c.data[0]).startswith("pending-")]
+        RESPONSE_CACHE.store(self.session.token, path, prods)
+        await self.api(DISK_STORE.put, self.cache_scope(), path, prods)
+
+    def sync_cards(self, holder, items, key_fn, build_fn, limit=None):
+        # Reaproveita os cards cujo registro não mudou e recria só os alterados; retorna quantos mudaram
+        existing = {c.data[0]: c for c in holder.controls if isinstance(c.data, tuple)}
+        if limit is not None:
+            items = items[:limit]
+        controls = []
+        changed = 0
+        for item in items:
+            key = key_fn(item)
+            card = existing.get(key)
+            if card is None or card.data[1] != item:
+                card = build_fn(item)
+                card.data = (key, item)
+                changed += 1
+            controls.append(card)
+        changed += len(existing) - (len(controls) - changed)
+        holder.controls[:] = controls
+        return changed
+
+    def cache_scope(self, path=None):
+        email = (self.current_user or {}).get("email") or ""
+        return email if path is None else disk_scope_for(path, email)
+
+    @profiled
+    @timed_view
     def show_donor_feed(self):
         self.clear()
 
@@ -489,188 +2988,592 @@ class DonationApp:
             )
         )
 
-        receivers_res = api_list_receivers("name_asc")
+        # Lista virtualizada: só as primeiras páginas viram controles; o resto entra conforme a rolagem
+        self.feed_receivers = []
+        self.feed_rendered = 0
+        self.favorite_buttons = {}
+        self.feed_list = ft.ListView(
+            [self.loading("Carregando causas...")],
+            spacing=20,
+            width=700,
+            height=FEED_VIEW_HEIGHT,
+            on_scroll=self.on_feed_scroll,
+            on_scroll_interval=100,
+        )
 
-        if isinstance(receivers_res, dict) and "receivers" in receivers_res:
-            receivers = receivers_res["receivers"]
-        elif isinstance(receivers_res, list):
-            receivers = receivers_res
-        else:
-            receivers = []
+        search = ft.TextField(
+            label="Buscar causas",
+            value=self.feed_search,
+            prefix_icon=ft.Icons.SEARCH,
+            width=440,
+            color=self.TEXT,
+            border_color=self.PRIMARY,
+            on_change=self.on_feed_search,
+        )
+        order = ft.Dropdown(
+            label="Ordenar por",
+            value=self.feed_order,
+            width=240,
+            color=self.TEXT,
+            border_color=self.PRIMARY,
+            options=[ft.dropdown.Option(key, label) for key, label in FEED_ORDERS.items()],
+            on_change=self.on_feed_order,
+        )
 
-        list_column = ft.Column(spacing=20)
+        self.container.controls.append(ft.Row([search, order], alignment=ft.MainAxisAlignment.CENTER, width=700))
+        self.container.controls.append(self.feed_list)
+        self.refresh_header()
+        self.update()
+        self.spawn(self.load_donor_feed, self.view_seq)
 
-        for r in receivers:
-            rid = r.get("UserId") or r.get("id_usuario") or r.get("Id")
-            receptor_nome = r.get("Name") or r.get("nome") or "Receptor"
-            receptor_desc = r.get("Description") or r.get("descricao") or "Sem descrição"
-
-            prods = api_get_cause_products(rid)
-
-            prod_list = []
-
-            if isinstance(prods, list):
-                for p in prods:
-                    product_name = p.get("ProductName") or p.get("name")
-                    product_desc = p.get("Description") or p.get("description")
-                    product_value = float(p.get("Value") or p.get("value") or 0.0)
-
-                    # Campos do formulário de doação por produto
-                    value_tf = ft.TextField(
-                        label="Valor da doação",
-                        width=200,
-                        keyboard_type=ft.KeyboardType.NUMBER,
-                        bgcolor="#4b0a6d",
-                        color="white",
-                        border_color=self.ACCENT,
-                    )
-                    msg_tf = ft.TextField(
-                        label="Mensagem (opcional)",
-                        width=300,
-                        multiline=True,
-                        bgcolor="#4b0a6d",
-                        color="white",
-                        border_color=self.ACCENT,
-                    )
-
-                    donation_controls = ft.Column(visible=False, spacing=8)
-
-                    def make_handlers(receiver_id, value_field, msg_field, controls_container):
-                        def open_form(e):
-                            controls_container.visible = True
-                            self.update()
-
-                        def cancel(e):
-                            controls_container.visible = False
-                            value_field.value = ""
-                            msg_field.value = ""
-                            self.update()
-
-                        def confirm(e):
-                            if not value_field.value.strip():
-                                self.snackbar("Informe um valor para a doação.")
-                                return
-                            try:
-                                amount = float(value_field.value.replace(",", "."))
-                            except ValueError:
-                                self.snackbar("Valor inválido.")
-                                return
-
-                            message = msg_field.value.strip() or "Doação feita"
-
-                            payload = {
-                                "DonorId": 0,
-                                "ReceiverId": receiver_id,
-                                "Amount": amount,
-                                "Date": str(datetime.now()),
-                                "Message": message,
-                            }
-
-                            print("Enviando doação:", payload)  # debug no console
-
-                            res = api_add_donation(payload)
-                            if res is None:
-                                self.snackbar("Erro ao registrar doação.")
-                            elif isinstance(res, dict) and res.get("error"):
-                                self.snackbar(f"Erro ao registrar doação: {res.get('error')}")
-                            else:
-                                self.snackbar("Doação realizada com sucesso!")
-                                controls_container.visible = False
-                                value_field.value = ""
-                                msg_field.value = ""
-
-                            self.update()
-
-                        return open_form, confirm, cancel
-
-                    open_form, confirm, cancel = make_handlers(
-                        rid, value_tf, msg_tf, donation_controls
-                    )
-
-                    confirm_btn = ft.ElevatedButton(
-                        "Confirmar doação",
-                        bgcolor=self.PRIMARY,
-                        color=self.TEXT,
-                        on_click=confirm,
-                    )
-                    cancel_btn = ft.TextButton(
-                        "Cancelar",
-                        on_click=cancel,
-                        style=ft.ButtonStyle(color=self.ACCENT),
-                    )
-
-                    donation_controls.controls.extend(
-                        [
-                            value_tf,
-                            msg_tf,
-                            ft.Row(
-                                [confirm_btn, cancel_btn],
-                                alignment=ft.MainAxisAlignment.START,
-                            ),
-                        ]
-                    )
-
-                    donate_btn = ft.ElevatedButton(
-                        "Doar",
-                        bgcolor=self.PRIMARY,
-                        color=self.TEXT,
-                        on_click=open_form,
-                    )
-
-                    prod_list.append(
-                        ft.Container(
-                            bgcolor="#3b0057",
-                            padding=10,
-                            border_radius=10,
-                            content=ft.Column(
-                                [
-                                    ft.Text(
-                                        product_name,
-                                        color="white",
-                                        size=18,
-                                    ),
-                                    ft.Text(
-                                        product_desc,
-                                        color="white",
-                                    ),
-                                    ft.Text(
-                                        f"Valor sugerido: R$ {product_value:.2f}",
-                                        color="white",
-                                    ),
-                                    ft.Container(height=5),
-                                    donate_btn,
-                                    donation_controls,
-                                ],
-                                spacing=8,
-                            ),
-                        )
-                    )
-
-            expansion = ft.ExpansionTile(
-                title=ft.Text(receptor_nome, size=20, color=self.TEXT),
-                subtitle=ft.Text(receptor_desc, color=self.ACCENT),
-                controls=prod_list
+    @profiled
+    @timed_view
+    async def load_donor_feed(self, seq):
+        self.spawn(self.load_favorites, seq)
+        if DELTA_SYNC and await self.sync_donor_feed(seq):
+            return
+        if self.delta is not None and self.feed_index is self.delta.index:
+            self.feed_index = FeedIndex()  # servidor sem /donator/sync: volta a um índice só desta sessão
+        path = "/donator/list_receivers/name_asc"
+        scope = self.cache_scope(path)
+
+        # Exibe primeiro o que ficou salvo em disco e depois revalida com o servidor
+        cached = await self.api(DISK_STORE.get, scope, path)
+        if cached is not None and seq == self.view_seq:
+            self.index_receivers(receivers_from(cached))
+            self.update()
+
+        # A lista chega em streaming: a primeira tela é desenhada assim que o primeiro lote é lido
+        receivers = []
+        refreshed = 0.0
+        try:
+            async for batch in run_api_stream(api_stream_receivers, "name_asc", session=self.session):
+                if seq != self.view_seq:
+                    return
+                receivers.extend(batch)
+                with self.feed_lock:
+                    for r in batch:
+                        self.feed_index.upsert_receiver(r)
+                    # Redesenha no primeiro lote e depois no máximo a cada STREAM_REFRESH_SECONDS
+                    if time.monotonic() - refreshed >= STREAM_REFRESH_SECONDS:
+                        self.refresh_feed()
+                        refreshed = time.monotonic()
+                        self.update()
+        except (httpx.HTTPError, ValueError):
+            if seq != self.view_seq:
+                return
+            if cached is None and not receivers:
+                self.feed_list.controls[:] = [ft.Text("Falha ao carregar causas.", color="red")]
+                self.update()
+            else:
+                self.snackbar("Sem conexão: exibindo causas salvas.")
+            return
+        if seq != self.view_seq:
+            return
+
+        with self.feed_lock:
+            self.feed_index.retain({r.id for r in receivers})
+            self.refresh_feed()
+        self.update()
+        payload = [r.to_api() for r in receivers]
+        if payload != cached:
+            await self.api(DISK_STORE.put, scope, path, payload)
+
+    async def sync_donor_feed(self, seq):
+        # Retorna False quando o servidor não oferece /donator/sync e o feed deve ser baixado por inteiro
+        delta = await self.delta_sync()
+        if not delta.supported:
+            return False
+        if delta.receivers and seq == self.view_seq:
+            self.show_synced_feed(delta)
+
+        changes = await self.api(delta.sync)
+        if seq != self.view_seq:
+            return True
+        if changes is None:
+            if not delta.supported:
+                return False
+            if delta.receivers:
+                self.snackbar("Sem conexão: exibindo causas salvas.")
+            else:
+                self.feed_list.controls[:] = [ft.Text("Falha ao carregar causas.", color="red")]
+                self.update()
+            return True
+
+        self.show_synced_feed(delta)
+        return True
+
+    async def delta_sync(self):
+        self.delta = DELTA
+        if not self.delta.loaded:
+            await self.api(self.delta.load)
+        return self.delta
+
+    def show_synced_feed(self, delta):
+        # Busca e ordenação usam o índice da cópia compartilhada, já atualizado pelo sync: a sessão não reindexa nada
+        with self.feed_lock:
+            self.feed_index = delta.index
+            self.refresh_feed()
+        self.update()
+
+    def favorites_state(self):
+        scope = self.cache_scope()
+        if self.favorites is None or self.favorites.scope != scope:
+            self.favorites = Favorites(scope)
+        return self.favorites
+
+    @profiled
+    async def load_favorites(self, seq):
+        # Favoritos sobem para o topo do feed e seus produtos são buscados antes dos demais
+        favorites = self.favorites_state()
+        if not favorites.loaded and not await self.api(favorites.load):
+            return
+        if seq != self.view_seq:
+            return
+        for rid in list(self.favorite_buttons):
+            self.paint_favorite(rid)
+        self.refresh_feed()
+        self.update()
+        if DELTA_SYNC and (await self.delta_sync()).supported:
+            return  # a cópia sincronizada já traz os produtos de todos os receptores
+        ids = [rid for rid in favorites.ids if rid not in self.feed_index.products]
+        for rid, prods, _ in await fetch_cause_products_many(ids, session=self.session):
+            if prods is not None:
+                self.index_products(rid, products_from(prods))
+
+    @profiled
+    def toggle_favorite(self, rid):
+        favorites = self.favorites_state()
+        _, schedule = favorites.toggle(rid)
+        self.paint_favorite(rid)
+        self.update()
+        if schedule:
+            self.spawn(self.sync_favorites)
+
+    async def sync_favorites(self):
+        # Espera FAVORITES_SYNC_DELAY para juntar cliques seguidos num único envio
+        await asyncio.sleep(FAVORITES_SYNC_DELAY)
+        favorites = self.favorites
+        if favorites is None:
+            return
+        if await self.api(favorites.flush):
+            self.snackbar("Falha ao salvar favoritos; nova tentativa na próxima alteração.")
+
+    def paint_favorite(self, rid):
+        btn = self.favorite_buttons.get(rid)
+        if btn is None:
+            return
+        on = self.favorites is not None and rid in self.favorites
+        btn.icon = ft.Icons.STAR if on else ft.Icons.STAR_BORDER
+        btn.tooltip = "Remover dos favoritos" if on else "Favoritar"
+
+    def apply_feed(self, receivers):
+        with self.feed_lock:
+            if not any(isinstance(c.data, tuple) for c in self.feed_list.controls):
+                self.feed_list.controls.clear()
+            self.feed_receivers = receivers
+            limit = max(self.feed_rendered, FEED_PAGE_SIZE)
+            self.sync_cards(self.feed_list, receivers, receiver_id, self.build_receiver_card, limit=limit)
+            self.feed_rendered = len(self.feed_list.controls)
+
+    def index_receivers(self, receivers):
+        with self.feed_lock:
+            self.feed_index.replace_receivers(receivers)
+            self.refresh_feed()
+
+    def index_products(self, rid, prods):
+        with self.feed_lock:
+            self.feed_index.set_products(rid, prods)
+
+    def refresh_feed(self):
+        # Busca e ordenação saem do índice local: nenhuma ida ao servidor, e os cards existentes são reaproveitados
+        with self.feed_lock:
+            receivers = self.feed_index.query(self.feed_search, self.feed_order)
+            if self.favorites is not None and self.favorites.ids:
+                receivers = self.favorites.ordered(receivers)
+            self.apply_feed(receivers)
+            if not receivers and self.feed_index.receivers:
+                self.feed_list.controls[:] = [ft.Text("Nenhuma causa encontrada.", color=self.TEXT)]
+
+    @profiled
+    def on_feed_search(self, e):
+        self.feed_search = e.control.value or ""
+        self.refresh_feed()
+        self.update()
+
+    @profiled
+    def on_feed_order(self, e):
+        self.feed_order = e.control.value or "name_asc"
+        self.refresh_feed()
+        self.update()
+
+    def render_feed_page(self):
+        with self.feed_lock:
+            start = self.feed_rendered
+            batch = self.feed_receivers[start:start + FEED_PAGE_SIZE]
+            for r in batch:
+                card = self.build_receiver_card(r)
+                card.data = (receiver_id(r), r)
+                self.feed_list.controls.append(card)
+            self.feed_rendered = start + len(batch)
+            return len(batch)
+
+    @profiled
+    def on_feed_scroll(self, e):
+        if self.feed_rendered >= len(self.feed_receivers):
+            return
+        if e.pixels >= e.max_scroll_extent - FEED_SCROLL_THRESHOLD:
+            if self.render_feed_page():
+                self.update()
+
+    @profiled
+    @timed_view
+    def show_donation_history(self):
+        self.clear()
+        scope = self.cache_scope()
+        if self.history is None or self.history.scope != scope:
+            self.history = DonationHistory(scope)
+        self.history_loading = False
+
+        self.container.controls.append(
+            ft.Container(
+                content=ft.Text("Minhas doações", color=self.TEXT, font_family="PoppinsBold", size=26, text_align=ft.TextAlign.CENTER),
+                padding=10,
+                bgcolor=self.CARD_BG,
+                border_radius=10,
+                margin=ft.margin.only(bottom=25, top=15),
+                alignment=ft.alignment.center,
+                width=600
             )
+        )
+        self.history_summary = ft.Column(spacing=6)
+        self.history_list = ft.ListView(
+            spacing=10,
+            width=700,
+            height=FEED_VIEW_HEIGHT - 160,
+            on_scroll=self.on_history_scroll,
+            on_scroll_interval=100,
+        )
+        self.container.controls.append(ft.Container(self.history_summary, padding=15, bgcolor=self.CARD_BG, border_radius=10, width=700))
+        self.container.controls.append(ft.Container(height=15))
+        self.container.controls.append(self.history_list)
+
+        # Páginas já carregadas aparecem na hora; só a próxima página vai à rede
+        cached = self.history.donations()
+        for d in cached:
+            self.history_list.controls.append(self.build_donation_card(d))
+        self.render_history_summary()
+        if not cached and not self.history.done:
+            self.history_list.controls.append(self.loading("Carregando doações..."))
+        self.refresh_header()
+        self.update()
+        if not cached:
+            self.spawn(self.load_history_page, self.view_seq)
+
+    @profiled
+    async def load_history_page(self, seq):
+        history = self.history
+        if self.history_loading or history.done:
+            return
+        self.history_loading = True
+        try:
+            fresh = await self.api(history.load_next)
+        finally:
+            self.history_loading = False
+        if seq != self.view_seq:
+            return
+        controls = [c for c in self.history_list.controls if isinstance(c.data, str)]
+        if fresh is None:
+            if not controls:
+                self.history_list.controls[:] = [ft.Text("Falha ao carregar doações.", color="red")]
+            else:
+                self.snackbar("Falha ao carregar mais doações.")
+            self.update()
+            return
+        self.history_list.controls[:] = controls + [self.build_donation_card(d) for d in fresh]
+        if not self.history_list.controls:
+            self.history_list.controls.append(ft.Text("Nenhuma doação realizada ainda.", color=self.TEXT))
+        self.render_history_summary()
+        self.update()
+
+    @profiled
+    def on_history_scroll(self, e):
+        if self.history.done or self.history_loading:
+            return
+        if e.pixels >= e.max_scroll_extent - FEED_SCROLL_THRESHOLD:
+            self.spawn(self.load_history_page, self.view_seq)
+
+    def receiver_name(self, rid):
+        r = self.feed_index.receivers.get(rid)
+        return r.name if r is not None and r.name else str(rid)
+
+    def render_history_summary(self):
+        history = self.history
+        with history.lock:
+            total, count = history.total, history.count
+            months = sorted(history.by_month.items(), reverse=True)[:6]
+            receivers = sorted(history.by_receiver.items(), key=lambda kv: kv[1][0], reverse=True)[:5]
+        more = "" if history.done else " (role para carregar mais)"
+        self.history_summary.controls[:] = [
+            ft.Text(f"Total doado: R$ {total:.2f} em {count} doação(ões){more}", color=self.TEXT, size=16),
+            ft.Text("Por mês: " + ", ".join(f"{m} R$ {v[0]:.2f}" for m, v in months) if months else "Por mês: —", color=self.ACCENT),
+            ft.Text("Por causa: " + ", ".join(f"{self.receiver_name(rid)} R$ {v[0]:.2f}" for rid, v in receivers) if receivers else "Por causa: —", color=self.ACCENT),
+        ]
+
+    def build_donation_card(self, d):
+        card = ft.Container(
+            ft.Column([
+                ft.Row([
+                    ft.Text(self.receiver_name(d.receiver_id), color=self.TEXT, size=16, expand=True),
+                    ft.Text(f"R$ {d.amount:.2f}", color=self.TEXT, size=16),
+                ]),
+                ft.Text(d.date[:16], color=self.ACCENT, size=12),
+                ft.Text(d.message, color=self.TEXT, size=13),
+            ], spacing=4),
+            padding=12,
+            bgcolor="#3b0057",
+            border_radius=10,
+        )
+        card.data = str(d.id)
+        return card
+
+    def build_receiver_card(self, r):
+        rid = r.id
+        receptor_nome = r.name or "Receptor"
+        receptor_desc = r.description or "Sem descrição"
+
+        star = ft.IconButton(icon_color=self.ACCENT, on_click=lambda e: self.toggle_favorite(rid))
+        self.favorite_buttons[rid] = star
+        self.paint_favorite(rid)
+
+        expansion = ft.ExpansionTile(
+            leading=star,
+            title=ft.Text(receptor_nome, size=20, color=self.TEXT),
+            subtitle=ft.Text(receptor_desc, color=self.ACCENT),
+            controls=[self.loading("Carregando produtos...")]
+        )
+        state = {"loaded": False}
 
-            list_column.controls.append(
-                ft.Card(
-                    ft.Container(
-                        content=expansion,
-                        padding=15,
-                        bgcolor=self.CARD_BG,
-                        border_radius=15
+        def show_products(prods):
+            if prods:
+                if not any(isinstance(c.data, tuple) for c in expansion.controls):
+                    expansion.controls.clear()
+                self.sync_cards(expansion, prods, product_key, lambda p: self.build_product_card(rid, p))
+            else:
+                expansion.controls[:] = [ft.Text("Nenhum produto cadastrado.", color=self.TEXT)]
+
+        # Os produtos só são buscados (e seus controles criados) quando o card é aberto
+        @profiled
+        async def on_change(e):
+            if e.data != "true" or state["loaded"]:
+                return
+            state["loaded"] = True
+            if self.delta is not None and self.delta.synced:
+                # A cópia sincronizada já tem os produtos de todos os receptores
+                show_products(self.delta.products_of(rid))
+                self.update()
+                return
+            path = f"/donator/get_cause_products/{rid}"
+            scope = self.cache_scope(path)
+            cached = await self.api(DISK_STORE.get, scope, path)
+            if cached is not None:
+                show_products(products_from(cached))
+                self.update()
+
+            prods = await self.api(api_get_cause_products, rid)
+            if prods is None:
+                if cached is None:
+                    state["loaded"] = False
+                    expansion.controls[:] = [ft.Text("Falha ao carregar produtos.", color="red")]
+                    self.update()
+                return
+            if prods != cached:
+                await self.api(DISK_STORE.put, scope, path, prods)
+            records = products_from(prods)
+            self.index_products(rid, records)
+            if prods != cached:
+                show_products(records)
+                self.update()
+
+        expansion.on_change = on_change
+
+        return ft.Card(
+            ft.Container(
+                content=expansion,
+                padding=15,
+                bgcolor=self.CARD_BG,
+                border_radius=15
+            ),
+            elevation=4
+        )
+
+    def build_product_card(self, receiver_id, p):
+        product_name = p.name
+        product_desc = p.description
+        product_value = p.value
+
+        # O formulário de doação é montado apenas no primeiro clique em "Doar"
+        donation_controls = ft.Column(visible=False, spacing=8)
+        fields = {}
+
+        def build_form():
+            value_field = ft.TextField(
+                label="Valor da doação",
+                width=200,
+                keyboard_type=ft.KeyboardType.NUMBER,
+                bgcolor="#4b0a6d",
+                color="white",
+                border_color=self.ACCENT,
+            )
+            msg_field = ft.TextField(
+                label="Mensagem (opcional)",
+                width=300,
+                multiline=True,
+                bgcolor="#4b0a6d",
+                color="white",
+                border_color=self.ACCENT,
+            )
+            confirm_btn = ft.ElevatedButton(
+                "Confirmar doação",
+                bgcolor=self.PRIMARY,
+                color=self.TEXT,
+                on_click=confirm,
+            )
+            cancel_btn = ft.TextButton(
+                "Cancelar",
+                on_click=cancel,
+                style=ft.ButtonStyle(color=self.ACCENT),
+            )
+            donation_controls.controls.extend(
+                [
+                    value_field,
+                    msg_field,
+                    ft.Row(
+                        [confirm_btn, cancel_btn],
+                        alignment=ft.MainAxisAlignment.START,
                     ),
-                    elevation=4
-                )
+                ]
             )
+            fields["value"] = value_field
+            fields["msg"] = msg_field
+            fields["confirm"] = confirm_btn
+
+        @profiled
+        def open_form(e):
+            if not fields:
+                build_form()
+            donation_controls.visible = True
+            self.update()
+
+        @profiled
+        def cancel(e):
+            donation_controls.visible = False
+            fields["value"].value = ""
+            fields["msg"].value = ""
+            self.update()
+
+        @profiled
+        async def confirm(e):
+            value_field = fields["value"]
+            msg_field = fields["msg"]
+            confirm_btn = fields["confirm"]
+            if not value_field.value.strip():
+                self.snackbar("Informe um valor para a doação.")
+                return
+            try:
+                amount = float(value_field.value.replace(",", "."))
+            except ValueError:
+                self.snackbar("Valor inválido.")
+                return
+
+            message = msg_field.value.strip() or "Doação feita"
+
+            payload = {
+                "DonorId": 0,
+                "ReceiverId": receiver_id,
+                "Amount": amount,
+                "Date": str(datetime.now()),
+                "Message": message,
+            }
+
+            key = uuid.uuid4().hex
+            scope = self.cache_scope()
+            res = None
+            # should_queue pode carregar o diário do disco: fica fora do loop do Flet
+            if not await self.api(DONATION_JOURNAL.should_queue, scope):
+                confirm_btn.disabled = True
+                self.update()
+                try:
+                    res = await self.api(api_add_donation, payload, key)
+                finally:
+                    confirm_btn.disabled = False
+            if is_transient_failure(res):
+                # Servidor fora do ar: a doação fica no diário local e é reenviada em segundo plano
+                try:
+                    await self.api(DONATION_JOURNAL.append, key, scope, payload)
+                except OSError:
+                    self.snackbar("Erro ao registrar doação.")
+                else:
+                    self.snackbar("Sem conexão: a doação foi salva e será enviada automaticamente.")
+                    donation_controls.visible = False
+                    value_field.value = ""
+                    msg_field.value = ""
+            elif isinstance(res, dict) and res.get("error") == 401:
+                self.snackbar("Sessão expirada: entre novamente para doar.")
+            elif isinstance(res, dict) and res.get("error"):
+                self.snackbar(f"Erro ao registrar doação: {res.get('error')}")
+            else:
+                self.snackbar("Doação realizada com sucesso!")
+                self.history = None
+                DONATION_JOURNAL.kick()  # o servidor respondeu: reenvia o que ainda estiver na fila
+                donation_controls.visible = False
+                value_field.value = ""
+                msg_field.value = ""
+
+            self.update()
+
+        donate_btn = ft.ElevatedButton(
+            "Doar",
+            bgcolor=self.PRIMARY,
+            color=self.TEXT,
+            on_click=open_form,
+        )
+
+        return ft.Container(
+            bgcolor="#3b0057",
+            padding=10,
+            border_radius=10,
+            content=ft.Column(
+                [
+                    ft.Text(
+                        product_name,
+                        color="white",
+                        size=18,
+                    ),
+                    ft.Text(
+                        product_desc,
+                        color="white",
+                    ),
+                    ft.Text(
+                        f"Valor sugerido: R$ {product_value:.2f}",
+                        color="white",
+                    ),
+                    ft.Container(height=5),
+                    donate_btn,
+                    donation_controls,
+                ],
+                spacing=8,
+            ),
+        )
+
+
+mark_startup("module_loaded")
 
-        self.container.controls.append(list_column)
-        self.refresh_header()
-        self.update()
-    
-       
 def main(page: ft.Page):
+    mark_startup("page_ready")
     DonationApp(page)
 
 if __name__ == "__main__":
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
     ft.app(target=main, view=ft.AppView.FLET_APP)
@@ -0,0 +1,499 @@
+import argparse
+import base64
+import bisect
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.json")
+SYNC_LOG_MAX = 100000
+
+def load_seed(path=DATA_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    return data.get("users", []), data.get("causes", [])
+
+def generate(receivers=0, products=0, donors=0, seed=42):
+    # Gera usuários e cotas sintéticos no mesmo formato de data.json
+    rnd = random.Random(seed)
+    words = ["Abrigo", "Casa", "Instituto", "Lar", "Projeto", "Associação", "Centro", "Rede"]
+    places = ["Esperança", "Solidária", "Paraná", "Vida", "Aurora", "São Jorge", "Horizonte", "Amparo"]
+    items = ["Remédios", "Alimentação", "Cobertores", "Água", "Higiene", "Roupas", "Telhas", "Colchões"]
+    users, causes = [], []
+    for i in range(receivers):
+        users.append({
+            "id": f"r{i:06d}",
+            "role": "receptor",
+            "name": f"{rnd.choice(words)} {rnd.choice(places)} {i}",
+            "email": f"receiver{i}@load",
+            "cpf_cnpj": "",
+            "password": "receiver",
+            "description": f"Receptor sintético {i}",
+            "pix_key": "",
+            "favorites": [],
+        })
+    for i in range(donors):
+        users.append({
+            "id": f"d{i:06d}",
+            "role": "doador",
+            "name": f"Doador {i}",
+            "email": f"donor{i}@load",
+            "cpf_cnpj": "",
+            "password": "donor",
+            "description": "",
+            "pix_key": "",
+            "favorites": [],
+        })
+    for i in range(products if receivers else 0):
+        causes.append({
+            "id": f"p{i:07d}",
+            "receptor_id": f"r{rnd.randrange(receivers):06d}",
+            "title": f"Cota: {rnd.choice(items)} {i}",
+            "description": f"Item sintético {i}",
+            "value": round(rnd.uniform(10, 500), 2),
+        })
+    return users, causes
+
+def make_token(claims):
+    # Token no formato JWT (header.payload.assinatura); a assinatura é fictícia, o token só vale enquanto estiver em self.tokens
+    def part(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj, separators=(",", ":")).encode("utf-8")).rstrip(b"=").decode("ascii")
+    return ".".join((part({"alg": "none", "typ": "JWT"}), part(claims), uuid.uuid4().hex))
+
+class Backend:
+    def __init__(self, users=(), causes=()):
+        self.lock = threading.Lock()
+        self.users = {}
+        self.by_email = {}
+        self.tokens = {}
+        self.products = {}
+        self.products_by_owner = {}
+        self.favorites = {}
+        self.donations = []
+        self.donations_by_donor = {}
+        self.idempotency = {}
+        self.version = 0
+        self._list_cache = {}
+        # Log de alterações para /donator/sync: (versão, tipo, id); tokens de outra instância ou anteriores ao log recebem 410
+        self.epoch = uuid.uuid4().hex[:8]
+        self.changes = []
+        self.log_floor = 0
+        for u in users:
+            self._add_user(dict(u))
+        for c in causes:
+            self._add_product(c.get("receptor_id"), c.get("title"), c.get("description"), c.get("value"), c.get("id"))
+
+    def _add_user(self, u):
+        u.setdefault("id", str(uuid.uuid4()))
+        self.users[u["id"]] = u
+        self.by_email[u.get("email", "").lower()] = u
+        if u.get("role") == "receptor":
+            self._log("receiver", u["id"])
+        return u
+
+    def _log(self, kind, key):
+        self.version += 1
+        self.changes.append((self.version, kind, key))
+        if len(self.changes) > SYNC_LOG_MAX:
+            drop = len(self.changes) - SYNC_LOG_MAX
+            self.log_floor = self.changes[drop - 1][0]
+            del self.changes[:drop]
+
+    def _add_product(self, owner, name, description, value, pid=None):
+        pid = pid or str(uuid.uuid4())
+        p = {
+            "ProductId": pid,
+            "OwnerId": owner,
+            "ProductName": name or "",
+            "Description": description or "",
+            "Value": float(value or 0.0),
+        }
+        self.products[pid] = p
+        self.products_by_owner.setdefault(owner, []).append(pid)
+        self._log("product", pid)
+        return p
+
+    def _public_product(self, p):
+        return {k: v for k, v in p.items() if k != "OwnerId"}
+
+    def user_for(self, token):
+        uid = self.tokens.get(token)
+        return self.users.get(uid) if uid else None
+
+    # --- endpoints ---
+
+    def login(self, body):
+        u = self.by_email.get(str(body.get("Username", "")).lower())
+        if u is None or u.get("password") != body.get("Password"):
+            return 401, {"detail": "invalid credentials"}
+        token = make_token({"sub": u.get("email"), "role": u.get("role"), "jti": uuid.uuid4().hex})
+        with self.lock:
+            self.tokens[token] = u["id"]
+        return 200, {"access_token": token, "token_type": "bearer", "user": u.get("email")}
+
+    def register(self, body):
+        email = str(body.get("Email") or "").lower()
+        if not email or not body.get("Password"):
+            return 400, {"detail": "missing fields"}
+        with self.lock:
+            if email in self.by_email:
+                return 409, {"detail": "conflict"}
+            role = "receptor" if body.get("IsReceiver") in ("receptor", True) else "doador"
+            u = self._add_user({
+                "role": role,
+                "name": body.get("Name") or email,
+                "email": email,
+                "password": body.get("Password"),
+                "cpf_cnpj": body.get("Document") or "",
+                "cep": body.get("Address") or "",
+                "description": body.get("Cause") or "",
+                "pix_key": "",
+                "favorites": [],
+            })
+        return 201, {"UserId": u["id"]}
+
+    def _receiver_row(self, u):
+        return {"UserId": u["id"], "Name": u.get("name", ""), "Description": u.get("description", "")}
+
+    def sync(self, since):
+        # since="<época>:<versão>"; vazio ou "0" devolve o estado completo
+        with self.lock:
+            if since in (None, "", "0"):
+                receivers = [self._receiver_row(u) for u in self.users.values() if u.get("role") == "receptor"]
+                products = [dict(self._public_product(p), ReceiverId=p["OwnerId"]) for p in self.products.values()]
+                return 200, {
+                    "token": f"{self.epoch}:{self.version}", "full": True,
+                    "receivers": {"upserts": receivers, "deletes": []},
+                    "products": {"upserts": products, "deletes": []},
+                }
+            epoch, _, version = since.partition(":")
+            try:
+                version = int(version)
+            except ValueError:
+                return 410, {"detail": "invalid sync token"}
+            if epoch != self.epoch or version < self.log_floor or version > self.version:
+                return 410, {"detail": "sync token expired"}
+            touched = {}
+            for _, kind, key in self.changes[bisect.bisect_right(self.changes, (version, "~")):]:
+                touched[(kind, key)] = True
+            delta = {"receivers": {"upserts": [], "deletes": []}, "products": {"upserts": [], "deletes": []}}
+            for kind, key in touched:
+                if kind == "receiver":
+                    u = self.users.get(key)
+                    if u is not None and u.get("role") == "receptor":
+                        delta["receivers"]["upserts"].append(self._receiver_row(u))
+                    else:
+                        delta["receivers"]["deletes"].append(key)
+                else:
+                    p = self.products.get(key)
+                    if p is not None:
+                        delta["products"]["upserts"].append(dict(self._public_product(p), ReceiverId=p["OwnerId"]))
+                    else:
+                        delta["products"]["deletes"].append(key)
+            return 200, dict(delta, token=f"{self.epoch}:{self.version}", full=False)
+
+    def receivers(self, order):
+        with self.lock:
+            key = (order, self.version)
+            cached = self._list_cache.get(key)
+            if cached is not None:
+                return 200, cached
+            rows = [self._receiver_row(u) for u in self.users.values() if u.get("role") == "receptor"]
+            rows.sort(key=lambda r: r["Name"].lower(), reverse=order.endswith("desc"))
+            self._list_cache = {key: rows}
+            return 200, rows
+
+    def cause_products(self, owner):
+        with self.lock:
+            return 200, [self._public_product(self.products[pid]) for pid in self.products_by_owner.get(owner, [])]
+
+    def own_products(self, user):
+        if user.get("role") != "receptor":
+            return 403, {"detail": "forbidden"}
+        return self.cause_products(user["id"])
+
+    def create_product(self, user, body):
+        if user.get("role") != "receptor":
+            return 403, {"detail": "forbidden"}
+        try:
+            value = float(body.get("Value") or 0.0)
+        except (TypeError, ValueError):
+            return 422, {"detail": "invalid value"}
+        if not body.get("Name"):
+            return 422, {"detail": "missing name"}
+        with self.lock:
+            p = self._add_product(user["id"], body.get("Name"), body.get("Description"), value)
+        return 201, self._public_product(p)
+
+    def delete_product(self, user, body):
+        if user.get("role") != "receptor":
+            return 403, {"detail": "forbidden"}
+        pid = body.get("ProductId")
+        with self.lock:
+            p = self.products.get(pid)
+            if p is None or p["OwnerId"] != user["id"]:
+                return 404, {"detail": "not found"}
+            del self.products[pid]
+            self.products_by_owner[user["id"]].remove(pid)
+            self._log("product", pid)
+        return 200, {"status": "deleted"}
+
+    def add_pix(self, user, body):
+        if user.get("role") != "receptor":
+            return 403, {"detail": "forbidden"}
+        user["pix_key"] = body.get("PixKey") or ""
+        return 201, {"status": "ok"}
+
+    def delete_pix(self, user):
+        if user.get("role") != "receptor":
+            return 403, {"detail": "forbidden"}
+        user["pix_key"] = ""
+        return 200, {"status": "deleted"}
+
+    def favorite(self, user, cause_id):
+        with self.lock:
+            favs = self.favorites.setdefault(user["id"], {})
+            for fid, cid in favs.items():
+                if cid == cause_id:
+                    return 200, {"FavoriteId": fid, "CauseId": cid}
+            fid = uuid.uuid4().hex[:12]
+            favs[fid] = cause_id
+        return 201, {"FavoriteId": fid, "CauseId": cause_id}
+
+    def remove_favorite(self, user, fav_id):
+        with self.lock:
+            if self.favorites.get(user["id"], {}).pop(fav_id, None) is None:
+                return 404, {"detail": "not found"}
+        return 200, {"status": "deleted"}
+
+    def list_favorites(self, user):
+        with self.lock:
+            favs = self.favorites.get(user["id"], {})
+            return 200, [{"FavoriteId": fid, "CauseId": cid} for fid, cid in favs.items()]
+
+    def add_donation(self, user, body, key=None):
+        # Repetições com a mesma Idempotency-Key devolvem a doação já registrada
+        if key:
+            with self.lock:
+                seen = self.idempotency.get((user["id"], key))
+            if seen is not None:
+                return 200, seen
+        try:
+            amount = float(body.get("Amount"))
+        except (TypeError, ValueError):
+            return 422, {"detail": "invalid amount"}
+        if body.get("ReceiverId") not in self.users:
+            return 404, {"detail": "receiver not found"}
+        donation = {
+            "DonationId": uuid.uuid4().hex,
+            "DonorId": user["id"],
+            "ReceiverId": body.get("ReceiverId"),
+            "Amount": amount,
+            "Date": body.get("Date") or str(datetime.now()),
+            "Message": body.get("Message") or "",
+        }
+        with self.lock:
+            if key:
+                seen = self.idempotency.get((user["id"], key))
+                if seen is not None:
+                    return 200, seen
+                self.idempotency[(user["id"], key)] = donation
+            self.donations.append(donation)
+            self.donations_by_donor.setdefault(user["id"], []).append(donation)
+        return 201, donation
+
+    def donations_made(self, user, cursor=None, limit=None):
+        # Sem limit devolve a lista inteira (formato antigo); com limit pagina da mais recente para a mais antiga.
+        # O cursor é a posição na lista do doador, estável porque doações só são acrescentadas
+        with self.lock:
+            mine = self.donations_by_donor.get(user["id"], [])
+            if limit is None:
+                return 200, list(mine)
+            try:
+                end = len(mine) if cursor in (None, "") else int(cursor)
+                limit = max(1, min(int(limit), 500))
+            except ValueError:
+                return 422, {"detail": "invalid cursor"}
+            end = max(0, min(end, len(mine)))
+            start = max(0, end - limit)
+            return 200, {"items": mine[start:end][::-1], "next_cursor": str(start) if start > 0 else None}
+
+class FaultConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.rnd.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self.error_rate > 0 and self.rnd.random() < self.error_rate
+        return max(0.0, self.latency_ms + jitter) / 1000.0, fail
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    backend = None
+    faults = None
+    quiet = True
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    def handle(self):
+        # O cliente pode fechar a conexão no meio de uma resposta em streaming (ex.: saiu da tela)
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    def _reply(self, status, payload, etag=None):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if self.command == "GET" and status == 200:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _user(self):
+        auth = self.headers.get("Authorization") or ""
+        token = auth[7:] if auth.startswith("Bearer ") else None
+        return self.backend.user_for(token) if token else None
+
+    def _dispatch(self):
+        delay, fail = self.faults.delay() if self.faults else (0.0, False)
+        if delay:
+            time.sleep(delay)
+        body = self._body() if self.command in ("POST", "PUT", "DELETE") else {}
+        if fail:
+            return self._reply(503, {"detail": "injected failure"})
+
+        path = self.path.split("?", 1)[0]
+        b = self.backend
+        if self.command == "POST" and path == "/login":
+            return self._reply(*b.login(body))
+        if self.command == "POST" and path == "/cadastrate":
+            return self._reply(*b.register(body))
+
+        user = self._user()
+        if user is None:
+            return self._reply(401, {"detail": "not authenticated"})
+
+        parts = path.strip("/").split("/")
+        route = (self.command, "/".join(parts[:2]))
+        if route == ("GET", "receiver/get_products"):
+            return self._reply(*b.own_products(user))
+        if route == ("POST", "receiver/create_product"):
+            return self._reply(*b.create_product(user, body))
+        if route == ("DELETE", "receiver/delete_product"):
+            return self._reply(*b.delete_product(user, body))
+        if route == ("POST", "receiver/add_pix_key"):
+            return self._reply(*b.add_pix(user, body))
+        if route == ("DELETE", "receiver/delete_pix_key"):
+            return self._reply(*b.delete_pix(user))
+        if route == ("GET", "donator/list_receivers") and len(parts) == 3:
+            return self._reply(*b.receivers(parts[2]))
+        if route == ("GET", "donator/get_cause_products") and len(parts) == 3:
+            return self._reply(*b.cause_products(parts[2]))
+        if route == ("POST", "donator/favorite") and len(parts) == 3:
+            return self._reply(*b.favorite(user, parts[2]))
+        if route == ("DELETE", "donator/favorite") and len(parts) == 3:
+            return self._reply(*b.remove_favorite(user, parts[2]))
+        if route == ("GET", "donator/favorites"):
+            return self._reply(*b.list_favorites(user))
+        if route == ("POST", "donator/add_donation"):
+            return self._reply(*b.add_donation(user, body, self.headers.get("Idempotency-Key")))
+        if route == ("GET", "donator/sync"):
+            query = parse_qs(self.path.partition("?")[2])
+            return self._reply(*b.sync(query.get("since", [""])[0]))
+        if route == ("GET", "donator/list_donations_made"):
+            query = parse_qs(self.path.partition("?")[2])
+            return self._reply(*b.donations_made(user, query.get("cursor", [None])[0], query.get("limit", [None])[0]))
+        return self._reply(404, {"detail": "not found"})
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+class BackendServer(ThreadingHTTPServer):
+    # A fila padrão do listen (5) descarta SYNs numa rajada de logins simultâneos, e o cliente vê ConnectTimeout
+    daemon_threads = True
+    request_queue_size = 256
+
+def make_server(backend, host="127.0.0.1", port=8000, faults=None, quiet=True):
+    handler = type("BoundHandler", (Handler,), {"backend": backend, "faults": faults, "quiet": quiet})
+    return BackendServer((host, port), handler)
+
+def serve_in_thread(backend, host="127.0.0.1", port=0, faults=None):
+    # Sobe o servidor em uma thread daemon; devolve (servidor, url)
+    server = make_server(backend, host, port, faults)
+    threading.Thread(target=server.serve_forever, name="mock-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def build_backend(args):
+    users, causes = load_seed(args.data)
+    extra_users, extra_causes = generate(args.receivers, args.products, args.donors, args.seed)
+    return Backend(users + extra_users, causes + extra_causes)
+
+def add_backend_args(parser):
+    parser.add_argument("--data", default=DATA_FILE, help="arquivo de dados inicial (users/causes)")
+    parser.add_argument("--receivers", type=int, default=0, help="receptores sintéticos adicionais")
+    parser.add_argument("--products", type=int, default=0, help="cotas sintéticas adicionais")
+    parser.add_argument("--donors", type=int, default=0, help="doadores sintéticos (donorN@load / donor)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência injetada por requisição")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="variação aleatória da latência")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 503 injetadas")
+
+def faults_from(args):
+    return FaultConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend local que serve a API do app a partir de data.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--verbose", action="store_true")
+    add_backend_args(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    backend = build_backend(args)
+    print(f"{len(backend.users)} usuários e {len(backend.products)} produtos carregados em {time.perf_counter() - started:.2f}s")
+    server = make_server(backend, args.host, args.port, faults_from(args), quiet=not args.verbose)
+    print(f"Servindo em http://{args.host}:{server.server_address[1]} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# main é importado direto da raiz, sem cache em disco nem diário de doações
+os.environ.setdefault("DISK_CACHE", "0")
+os.environ.setdefault("DONATION_JOURNAL", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
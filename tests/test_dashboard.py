@@ -0,0 +1,65 @@
+import flet as ft
+import pytest
+
+import bench
+import main
+
+@pytest.fixture(scope="module")
+def backend():
+    server, url = bench.build_backend(3, 1, 0, 0)
+    main.close_http_clients()
+    previous, main.API_URL = main.API_URL, url
+    yield server.RequestHandlerClass.backend
+    main.API_URL = previous
+    main.close_http_clients()
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def dashboard(backend):
+    h = bench.Harness()
+    h.new_app()
+    h.app.current_user = bench.login_as(h.app, "bench-receiver@load", "bench", "receptor")
+    h.call(h.app.show_receptor_dashboard)
+    h.wait_idle()
+    return h
+
+def owned_names(h):
+    return [c.data[1].name for c in h.app.owned_list.controls if isinstance(c.data, tuple)]
+
+def create(h, title, value):
+    bench.find(h.page, ft.TextField, label="Título do Produto/Cota").value = title
+    bench.find(h.page, ft.TextField, label="Valor (ex: 50.00)").value = value
+    h.fire(bench.find(h.page, ft.ElevatedButton, text="Criar").on_click)
+    h.wait_idle()
+
+def test_create_parses_the_form_value_once(dashboard, backend):
+    create(dashboard, "Cota decimal", "10,1250")
+    assert "Cota decimal" in owned_names(dashboard)
+    assert [p["Value"] for p in backend.products.values() if p["ProductName"] == "Cota decimal"] == [10.125]
+
+def test_create_failure_removes_the_pending_card(dashboard, monkeypatch):
+    def boom(prod):
+        raise RuntimeError("falha inesperada")
+    monkeypatch.setattr(main, "api_create_product", boom)
+    before = owned_names(dashboard)
+    create(dashboard, "Cota perdida", "15")
+    assert owned_names(dashboard) == before
+    assert "falha inesperada" in dashboard.page.snack_bar.content.value
+
+def test_import_reports_each_failed_row(dashboard, monkeypatch):
+    real = main.api_create_product
+
+    def flaky(prod):
+        if prod["title"] == "Quebra":
+            raise RuntimeError("linha quebrou")
+        return real(prod)
+    monkeypatch.setattr(main, "api_create_product", flaky)
+    bench.find(dashboard.page, ft.TextField, multiline=True, min_lines=4).value = (
+        '[{"title": "Inteira", "value": 12.125}, {"title": "Quebra", "value": 3}, {"title": "Outra", "value": 4}]'
+    )
+    dashboard.fire(bench.find(dashboard.page, ft.ElevatedButton, text="Importar").on_click)
+    dashboard.wait_idle()
+    assert {"Inteira", "Outra"} <= set(owned_names(dashboard))
+    report = [c.value for c in bench.walk(dashboard.page.controls[0]) if isinstance(c, ft.Text) and "Linha" in str(c.value)]
+    assert report == ["Linha 2: linha quebrou"]
@@ -0,0 +1,73 @@
+import pytest
+
+import main
+from main import float_format, parse_product_rows
+
+@pytest.mark.parametrize("text, expected", [
+    ("12.50", 12.5),
+    ("12,50", 12.5),
+    ("1.234,56", 1234.56),
+    ("1.234.567", 1234567.0),
+    ("0,500", 0.5),
+    ("1234.567", 1234.567),
+    ("10", 10.0),
+])
+def test_float_format(text, expected):
+    assert float_format(text) == expected
+
+@pytest.mark.parametrize("text", ["1,234.56", "1.000", "1,000", "12.500", "1,2,3", "1.23.4", "abc"])
+def test_float_format_rejects_ambiguous(text):
+    with pytest.raises(ValueError):
+        float_format(text)
+
+def test_csv_extra_field_is_an_error():
+    rows, errors = parse_product_rows("title,description,value\nArroz,Cesta básica,12,50\nFeijão,Kg,8.5")
+    assert rows == [(3, {"title": "Feijão", "description": "Kg", "value": 8.5})]
+    assert [line for line, _ in errors] == [2]
+    assert "4 campos, esperados 3" in errors[0][1]
+
+def test_csv_missing_field_is_an_error():
+    rows, errors = parse_product_rows("title;description;value\nLeite;Caixa\nÓleo;Lata;7,90")
+    assert rows == [(3, {"title": "Óleo", "description": "Lata", "value": 7.9})]
+    assert errors == [(2, "2 campos, esperados 3")]
+
+def test_csv_quoted_decimal_comma():
+    rows, errors = parse_product_rows('title,description,value\n"Arroz","Cesta básica","12,50"')
+    assert rows == [(2, {"title": "Arroz", "description": "Cesta básica", "value": 12.5})] and errors == []
+
+def test_csv_ambiguous_value_reports_line():
+    rows, errors = parse_product_rows("title;description;value\nArroz;Cesta;12,50\nX;Y;1,234.56\nZ;W;1.000")
+    assert [line for line, _ in rows] == [2]
+    assert [line for line, _ in errors] == [3, 4]
+
+def test_json_causes_allow_null_fields():
+    rows, errors = parse_product_rows('{"causes": [{"title": "A", "description": null, "value": "3,5"}, {"title": ""}]}')
+    assert rows == [(1, {"title": "A", "description": "", "value": 3.5})]
+    assert errors == [(2, "título vazio")]
+
+@pytest.mark.parametrize("value", [12.125, 1.5, 10, 1000.0])
+def test_float_format_keeps_numbers(value):
+    assert float_format(value) == value
+
+def test_form_value_with_four_decimals():
+    assert float_format("10,1250") == 10.125
+
+def test_json_numeric_values_are_not_reparsed():
+    rows, errors = parse_product_rows('[{"title": "A", "value": 12.125}, {"title": "B", "value": 1000}]')
+    assert [row["value"] for _, row in rows] == [12.125, 1000.0] and errors == []
+
+def test_create_payload_keeps_the_parsed_value(monkeypatch):
+    sent = []
+    monkeypatch.setattr(main, "api_post", lambda path, payload, headers=None: sent.append(payload))
+    main.api_create_product({"title": "A", "description": "", "value": 12.125})
+    assert sent[0]["Value"] == 12.125
+
+@pytest.mark.parametrize("text", ["Arroz;Cesta básica;12,50\nFeijão;Kg;8,5", "nome;preco\nArroz;12,50"])
+def test_csv_without_known_header_is_an_error(text):
+    rows, errors = parse_product_rows(text)
+    assert rows == [] and len(errors) == 1
+    line, message = errors[0]
+    assert line == 1 and "cabeçalho" in message and "title;description;value" in message
+
+def test_json_without_product_list_is_an_error():
+    assert parse_product_rows('{"versao": 2}') == ([], [(1, "JSON sem lista de produtos: use uma lista ou o formato de causes do data.json")])
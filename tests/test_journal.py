@@ -0,0 +1,70 @@
+import main
+from main import DonationJournal
+
+class FakeSession:
+    # Responde a cada envio com o próximo resultado da lista e registra as chaves enviadas
+    def __init__(self, *results):
+        self.results = list(results)
+        self.sent = []
+
+    def run(self, fn, payload, key):
+        self.sent.append(key)
+        return self.results.pop(0) if self.results else {"id": key}
+
+def journal(*keys):
+    j = DonationJournal(None)
+    for key in keys:
+        j.entries[key] = ("donor@x", {"Amount": 1})
+    return j
+
+def test_expired_token_keeps_entries_and_deactivates_scope():
+    j = journal("a", "b")
+    calls = []
+    listener = lambda *args: calls.append(args)
+    expired = FakeSession({"error": 401})
+    j.activate("donor@x", expired, listener)
+    assert j.flush("donor@x") == (0, 0)
+    assert [k for k, _ in j.pending("donor@x")] == ["a", "b"]
+    assert expired not in j.sessions
+    assert calls == [(0, 0, True)]
+
+    # Novo login: as mesmas doações são reenviadas com o novo token
+    fresh = FakeSession()
+    j.activate("donor@x", fresh)
+    assert j.flush("donor@x") == (2, 0)
+    assert fresh.sent == ["a", "b"] and not j.pending()
+
+def test_definitive_rejection_is_dropped_and_transient_failure_is_kept():
+    j = journal("a", "b", "c")
+    session = FakeSession({"error": 422}, {"id": 1}, {"error": 503})
+    j.activate("donor@x", session)
+    assert j.flush("donor@x") == (1, 1)
+    assert [k for k, _ in j.pending("donor@x")] == ["c"]
+    assert session in j.sessions
+
+def test_sessions_sharing_an_account_are_independent():
+    j = journal("a")
+    first, second = FakeSession(), FakeSession()
+    j.activate("donor@x", first)
+    j.activate("donor@x", second)
+    j.deactivate(second)  # logout numa aba não desliga a outra
+    assert j.flush("donor@x") == (1, 0)
+    assert first.sent == ["a"] and second.sent == []
+
+def test_listener_does_not_keep_a_closed_page_alive():
+    class Page:
+        def notify(self, *args):
+            pass
+
+    j = journal("a")
+    page = Page()
+    session = FakeSession()
+    j.activate("donor@x", session, page.notify)
+    del page
+    assert j.flush("donor@x") == (0, 0)
+    assert session not in j.sessions and session.sent == []
+
+def test_pending_entries_do_not_skip_the_network():
+    # Com o circuito fechado, a fila pendente não desvia novas doações para o diário
+    assert main.breaker_for().stats()["state"] == "closed"
+    assert not journal("a").should_queue("donor@x")
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from main import iter_json_array
+
+def split_every(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_number_split_after_dot_or_exponent():
+    chunks = [b"[", b"12345, 6.", b"5e10, -3, true]"]
+    assert list(iter_json_array(chunks)) == [12345, 6.5e10, -3, True]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+def test_any_chunk_split(size):
+    items = [1, -2.5e-3, 12345, "a,b]", {"Nome": "Açaí", "v": [1, 2]}, None, False, 0.125, "ünï"]
+    data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+    assert list(iter_json_array(split_every(data, size))) == items
+
+def test_object_body_falls_back_to_full_parse():
+    chunks = split_every(b'{"receivers": [{"Id": 1}, {"Id": 2}]}', 4)
+    assert list(iter_json_array(chunks)) == [{"Id": 1}, {"Id": 2}]
+
+def test_incomplete_array_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b"[1, 2,", b" 3"]))